@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas_market_calendars as mcal
+import pytz
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from market_calendar import SessionCalendar
+from timing import emit, summarize
+
+
+def legacy_last_market_close() -> datetime.datetime:
+    exchange = mcal.get_calendar("NASDAQ")
+    today = datetime.datetime.now(pytz.timezone("US/Eastern"))
+    valid_days = exchange.valid_days(
+        start_date=(today - relativedelta(days=14)).strftime("%Y-%m-%d"),
+        end_date=today.strftime("%Y-%m-%d"),
+    )
+    last_day = valid_days[-2]
+    close = exchange["market_close", last_day.strftime("%Y-%m-%d")]
+    return datetime.datetime(
+        year=last_day.year,
+        month=last_day.month,
+        day=last_day.day,
+        hour=close.hour,
+        minute=close.minute,
+        second=0,
+        microsecond=0,
+        tzinfo=pytz.timezone("US/Eastern"),
+    )
+
+
+def _measure(function: Callable[[], datetime.datetime], iterations: int) -> dict[str, float]:
+    timings: list[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare last-market-close lookups used by /close.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    calendar = SessionCalendar()
+    calendar.refresh()
+
+    params = {"iterations": args.iterations}
+    emit("api.close", "legacy", params, **_measure(legacy_last_market_close, args.iterations))
+    emit("api.close", "session_calendar", params, **_measure(calendar.last_close, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
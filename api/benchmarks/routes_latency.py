@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+from redis import Redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from connection import db_sync
+from main import app
+from series import BAR_AGGREGATIONS
+from store_latency import clear, seed
+from timing import emit, summarize
+
+WATCHLIST_SIZE = 10
+SERIES_MINUTES = 390
+MINUTE_MS = 60 * 1000
+
+
+def seed_series(db: Redis, symbols: list[str], end: int) -> None:
+    pipe = db.pipeline(transaction=False)
+    for symbol in symbols:
+        for minute in range(SERIES_MINUTES):
+            timestamp = end - (SERIES_MINUTES - minute) * MINUTE_MS
+            pipe.ts().add(
+                f"stocks:{symbol}:trades:price",
+                timestamp,
+                100.0 + minute,
+                duplicate_policy="last",
+                labels={"symbol": symbol, "family": "trades", "field": "price", "tier": "raw"},
+            )
+            for field in BAR_AGGREGATIONS:
+                pipe.ts().add(
+                    f"stocks:{symbol}:bars:{field}",
+                    timestamp,
+                    100.0 + minute,
+                    duplicate_policy="last",
+                    labels={"symbol": symbol, "family": "bars", "field": field, "tier": "raw"},
+                )
+    pipe.execute()
+
+
+def routes(symbols: list[str], end: int) -> list[tuple[str, str, str, dict]]:
+    symbol = symbols[0]
+    joined = ",".join(symbols)
+    start = end - SERIES_MINUTES * MINUTE_MS
+    return [
+        ("watchlist", "GET", "/api/1.0/watchlist", {}),
+        ("watchlist", "GET", "/api/1.0/watchlist", {"fields": "symbol,name,last_sale"}),
+        ("search", "GET", "/api/1.0/search/BENCH0", {}),
+        ("search", "GET", "/api/1.0/search/BENCH0", {"fields": "symbol,name"}),
+        ("bars", "GET", f"/api/1.0/bars/{symbol}", {}),
+        ("bars", "GET", f"/api/1.0/bars/{symbol}", {"start": start, "end": end, "resolution": "5m"}),
+        ("close", "GET", f"/api/1.0/close/{symbol}", {}),
+        ("trade", "GET", f"/api/1.0/trade/{symbol}", {}),
+        ("trades", "GET", "/api/1.0/trade", {"symbols": joined}),
+        ("closes", "GET", "/api/1.0/close", {"symbols": joined}),
+        ("bars_batch", "GET", "/api/1.0/bars", {"symbols": joined, "start": start, "end": end, "points": 30}),
+        ("dashboard", "GET", "/api/1.0/dashboard", {}),
+        ("trending", "GET", "/api/1.0/trending", {}),
+        ("watch", "POST", f"/api/1.0/watchlist/{symbol}", {}),
+        ("unwatch", "DELETE", f"/api/1.0/watchlist/{symbol}", {}),
+    ]
+
+
+async def measure(client: AsyncClient, method: str, path: str, params: dict, iterations: int) -> dict:
+    await client.request(method, path, params=params)
+    timings: list[float] = []
+    statuses: set[int] = set()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = await client.request(method, path, params=params)
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses.add(response.status_code)
+    return {"status": sorted(statuses), **summarize(timings)}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure p50/p99 latency of the /api/1.0 HTTP routes.")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--watchlist", type=int, default=WATCHLIST_SIZE)
+    parser.add_argument("--include-reset", action="store_true", help="Also time POST /demo/reset (wipes demo data)")
+    args = parser.parse_args()
+
+    saved_watchlist = db_sync.smembers("watchlist")
+    clear(db_sync)
+    symbols = seed(db_sync)[: args.watchlist]
+    end = int(time.time() * 1000)
+    seed_series(db_sync, symbols, end)
+    db_sync.delete("watchlist")
+    db_sync.sadd("watchlist", *symbols)
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            for name, method, path, params in routes(symbols, end):
+                emit(
+                    "api.routes",
+                    name,
+                    {"method": method, "params": params, "watchlist": len(symbols), "iterations": args.iterations},
+                    **await measure(client, method, path, params, args.iterations),
+                )
+            if args.include_reset:
+                emit(
+                    "api.routes",
+                    "demo_reset",
+                    {"method": "POST", "params": {}, "iterations": 1},
+                    **await measure(client, "POST", "/api/1.0/demo/reset", {}, 1),
+                )
+    finally:
+        clear(db_sync)
+        db_sync.delete("watchlist")
+        if saved_watchlist:
+            db_sync.sadd("watchlist", *saved_watchlist)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
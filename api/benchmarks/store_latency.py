@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from redis import Redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from store import SUMMARY_FIELDS, TYPEAHEAD_FIELDS, ensure_index, get_stocks, save_stock, search_stocks
+from timing import emit, summarize
+
+BENCH_STOCKS = 200
+BENCH_NEWS = 20
+WATCHLIST_SIZES = [1, 10, 50, 200]
+SEARCH_PREFIXES = ["BENCH000", "BENCH00", "BENCH0"]
+GET_STOCKS_FIELDS: dict[str, tuple[str, ...] | None] = {"full": None, "summary": SUMMARY_FIELDS}
+SEARCH_FIELDS: dict[str, tuple[str, ...] | None] = {"full": None, "typeahead": TYPEAHEAD_FIELDS}
+
+
+def bench_symbol(index: int) -> str:
+    return f"BENCH{index:03d}"
+
+
+def seed(db: Redis, count: int = BENCH_STOCKS, news: int = BENCH_NEWS) -> list[str]:
+    ensure_index(db)
+    symbols = [bench_symbol(index) for index in range(count)]
+    for symbol in symbols:
+        save_stock(
+            db,
+            {
+                "pk": symbol,
+                "symbol": symbol,
+                "name": f"{symbol} Holdings",
+                "last_sale": "$100.00",
+                "market_cap": "1000000",
+                "country": "United States",
+                "ipo": "2000",
+                "volume": "1000",
+                "sector": "Technology",
+                "industry": "Benchmarks",
+                "news": [
+                    {
+                        "id": f"{symbol}-{item}",
+                        "headline": f"{symbol} headline {item}",
+                        "summary": "Benchmark summary " * 10,
+                        "symbols": [symbol],
+                    }
+                    for item in range(news)
+                ],
+            },
+        )
+    return symbols
+
+
+def clear(db: Redis) -> None:
+    keys = list(db.scan_iter(match="stocks:BENCH*"))
+    if keys:
+        db.delete(*keys)
+
+
+def measure(function: Callable[[], object], iterations: int) -> dict[str, float]:
+    function()
+    timings: list[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure get_stocks and search_stocks latency.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--news", type=int, default=BENCH_NEWS)
+    args = parser.parse_args()
+
+    db = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+    clear(db)
+    symbols = seed(db, news=args.news)
+
+    try:
+        for size in WATCHLIST_SIZES:
+            watchlist = symbols[:size]
+            for projection, fields in GET_STOCKS_FIELDS.items():
+                emit(
+                    "api.store",
+                    "get_stocks",
+                    {"symbols": size, "fields": projection, "news": args.news, "iterations": args.iterations},
+                    results=len(get_stocks(db, watchlist, fields)),
+                    **measure(lambda: get_stocks(db, watchlist, fields), args.iterations),
+                )
+
+        for prefix in SEARCH_PREFIXES:
+            for projection, fields in SEARCH_FIELDS.items():
+                emit(
+                    "api.store",
+                    "search_stocks",
+                    {"query": prefix, "fields": projection, "news": args.news, "iterations": args.iterations},
+                    results=len(search_stocks(db, prefix, fields)),
+                    **measure(lambda: search_stocks(db, prefix, fields), args.iterations),
+                )
+    finally:
+        clear(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+
+from redis.asyncio import Redis as AsyncRedis
+
+LOGGER = logging.getLogger(__name__)
+
+WS_QUEUE_LIMIT = int(os.getenv("WS_QUEUE_LIMIT", "1000"))
+WS_DISCONNECT_DROPS = int(os.getenv("WS_DISCONNECT_DROPS", "1000"))
+
+Loader = Callable[[str], Awaitable[list[object]]]
+KeyFunction = Callable[[object], Hashable]
+
+
+class SlowConsumerError(Exception):
+    pass
+
+
+def payload_key(payload: object) -> Hashable:
+    if isinstance(payload, dict) and "symbol" in payload:
+        return payload["symbol"]
+    return payload
+
+
+class Subscription:
+    def __init__(self, limit: int = WS_QUEUE_LIMIT, disconnect_drops: int = WS_DISCONNECT_DROPS) -> None:
+        self.limit = max(limit, 1)
+        self.disconnect_drops = max(disconnect_drops, 1)
+        self.pending: dict[Hashable, tuple[object, float]] = {}
+        self.received_at = 0.0
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.delivered = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.drop_streak = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.pending)
+
+    def empty(self) -> bool:
+        return not self.pending
+
+    def put(self, key: Hashable, payload: object, received_at: float = 0.0) -> bool:
+        if self.closed:
+            return False
+        if key in self.pending:
+            self.pending[key] = (payload, received_at)
+            self.conflated += 1
+        elif len(self.pending) < self.limit:
+            self.pending[key] = (payload, received_at)
+        else:
+            self.dropped += 1
+            self.drop_streak += 1
+            if self.drop_streak >= self.disconnect_drops:
+                self.closed = True
+                self.ready.set()
+            return False
+        self.ready.set()
+        return True
+
+    async def get(self) -> object:
+        while not self.pending and not self.closed:
+            self.ready.clear()
+            await self.ready.wait()
+        if self.closed:
+            raise SlowConsumerError
+        key = next(iter(self.pending))
+        payload, self.received_at = self.pending.pop(key)
+        self.delivered += 1
+        self.drop_streak = 0
+        return payload
+
+
+class Broadcaster:
+    def __init__(self, db: AsyncRedis, channel: str, loader: Loader, key: KeyFunction = payload_key) -> None:
+        self.db = db
+        self.channel = channel
+        self.loader = loader
+        self.key = key
+        self.connections: set[Subscription] = set()
+        self.task: asyncio.Task | None = None
+        self.events = 0
+        self.delivered = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    @property
+    def connection_count(self) -> int:
+        return len(self.connections)
+
+    def stats(self) -> dict[str, int]:
+        connections = list(self.connections)
+        return {
+            "connections": len(connections),
+            "events": self.events,
+            "queued": sum(subscription.depth for subscription in connections),
+            "max_queue_depth": max((subscription.depth for subscription in connections), default=0),
+            "delivered": self.delivered + sum(subscription.delivered for subscription in connections),
+            "conflated": self.conflated + sum(subscription.conflated for subscription in connections),
+            "dropped": self.dropped + sum(subscription.dropped for subscription in connections),
+            "disconnected": self.disconnected,
+        }
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[Subscription]:
+        subscription = Subscription()
+        self.connections.add(subscription)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._listen())
+        try:
+            yield subscription
+        finally:
+            self.connections.discard(subscription)
+            self.delivered += subscription.delivered
+            self.conflated += subscription.conflated
+            self.dropped += subscription.dropped
+            if subscription.closed:
+                self.disconnected += 1
+                LOGGER.warning("Disconnected slow %s consumer after %d drops", self.channel, subscription.dropped)
+            if not self.connections:
+                await self.close()
+
+    def deliver(self, payloads: list[object], received_at: float | None = None) -> None:
+        received_at = time.monotonic() if received_at is None else received_at
+        for subscription in list(self.connections):
+            for payload in payloads:
+                subscription.put(self.key(payload), payload, received_at)
+
+    async def close(self) -> None:
+        task, self.task = self.task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                await self._consume()
+            except Exception:
+                LOGGER.exception("Lost %s subscription, reconnecting", self.channel)
+                await asyncio.sleep(1)
+
+    async def _consume(self) -> None:
+        pubsub = self.db.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            async for event in pubsub.listen():
+                if event["type"] != "message":
+                    continue
+
+                self.events += 1
+                received_at = time.monotonic()
+                try:
+                    payloads = await self.loader(str(event["data"]))
+                except Exception:
+                    LOGGER.exception("Failed to load %s event", self.channel)
+                    continue
+
+                self.deliver(payloads, received_at)
+        finally:
+            await pubsub.aclose()
@@ -4,7 +4,8 @@ import os
 from redis import Redis
 from redis.asyncio import Redis as AsyncRedis
 
+from profiling import REDIS_PROFILE, ProfiledAsyncRedis, ProfiledRedis
 
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-db = AsyncRedis.from_url(redis_url, decode_responses=True)
-db_sync = Redis.from_url(redis_url, decode_responses=True)
+db = (ProfiledAsyncRedis if REDIS_PROFILE else AsyncRedis).from_url(redis_url, decode_responses=True)
+db_sync = (ProfiledRedis if REDIS_PROFILE else Redis).from_url(redis_url, decode_responses=True)
@@ -1,17 +1,25 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from connection import db_sync
-from routes import router
+from metrics import METRICS_ENABLED, instrument
+from profiling import REDIS_PROFILE, profile_request
+from routes import hubs, router, session_calendar
 from store import ensure_index
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     ensure_index(db_sync)
+    await asyncio.to_thread(session_calendar.refresh)
+    calendar_task = asyncio.create_task(session_calendar.refresh_daily())
     yield
+    calendar_task.cancel()
+    for hub in hubs:
+        await hub.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -24,3 +32,7 @@ app.add_middleware(
 )
 
 app.include_router(router)
+if REDIS_PROFILE:
+    app.middleware("http")(profile_request)
+if METRICS_ENABLED:
+    instrument(app, hubs)
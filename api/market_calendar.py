@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import datetime
+import logging
+import os
+import threading
+
+import pandas_market_calendars as mcal
+import pytz
+from dateutil.relativedelta import relativedelta
+
+LOGGER = logging.getLogger(__name__)
+
+EASTERN = pytz.timezone("US/Eastern")
+CALENDAR_YEARS = int(os.getenv("MARKET_CALENDAR_YEARS", "2"))
+
+
+class SessionCalendar:
+    def __init__(self, exchange: str = "NASDAQ", years: int = CALENDAR_YEARS) -> None:
+        self.exchange = exchange
+        self.years = max(years, 1)
+        self.built_for: datetime.date | None = None
+        self.schedule: tuple[list[datetime.date], list[datetime.datetime]] = ([], [])
+        self.lock = threading.Lock()
+
+    def _build(self, today: datetime.date) -> None:
+        schedule = mcal.get_calendar(self.exchange).schedule(
+            start_date=(today - relativedelta(years=self.years)).isoformat(),
+            end_date=(today + relativedelta(years=1)).isoformat(),
+        )
+        sessions = [timestamp.date() for timestamp in schedule.index]
+        closes = [timestamp.to_pydatetime() for timestamp in schedule["market_close"]]
+        self.schedule = (sessions, closes)
+        self.built_for = today
+
+    def refresh(self, now: datetime.datetime | None = None) -> None:
+        today = (now or datetime.datetime.now(EASTERN)).astimezone(EASTERN).date()
+        if self.built_for == today:
+            return
+        with self.lock:
+            if self.built_for != today:
+                self._build(today)
+
+    async def refresh_daily(self) -> None:
+        while True:
+            now = datetime.datetime.now(EASTERN)
+            tomorrow = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+            await asyncio.sleep((EASTERN.localize(tomorrow) - now).total_seconds() + 1)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                LOGGER.exception("Rebuilding the %s session calendar failed", self.exchange)
+
+    def last_close(self, now: datetime.datetime | None = None) -> datetime.datetime:
+        now = (now or datetime.datetime.now(EASTERN)).astimezone(EASTERN)
+        if not self.schedule[0]:
+            self.refresh(now)
+        sessions, closes = self.schedule
+        session = bisect.bisect_right(sessions, now.date()) - 2
+        if session < 0:
+            raise ValueError(f"No {self.exchange} session before {now.isoformat()}")
+        return closes[session].astimezone(EASTERN)
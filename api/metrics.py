@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from broadcast import Broadcaster
+
+if TYPE_CHECKING:
+    from profiling import RedisProfile
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() != "false"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+WS_DELIVERY_LAG = Histogram(
+    "api_ws_delivery_lag_seconds",
+    "Time from receiving a pub/sub event to sending the resulting WebSocket message",
+    ("channel",),
+    buckets=LATENCY_BUCKETS,
+)
+
+REDIS_COMMANDS = Counter("api_redis_commands", "Redis commands sent while serving a route", ("route", "command"))
+REDIS_COMMANDS_PER_REQUEST = Histogram(
+    "api_redis_commands_per_request",
+    "Redis commands sent per request",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+REDIS_CALLS_PER_REQUEST = Histogram(
+    "api_redis_calls_per_request",
+    "Redis round trips (commands or pipelines) per request",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+REDIS_TIME_PER_REQUEST = Histogram(
+    "api_redis_seconds_per_request",
+    "Cumulative time spent waiting on Redis per request",
+    ("route",),
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class HubCollector(Collector):
+    def __init__(self, hubs: Iterable[Broadcaster]) -> None:
+        self.hubs = tuple(hubs)
+
+    def collect(self) -> Iterator[Metric]:
+        gauges = {
+            "connections": GaugeMetricFamily("api_ws_clients", "Connected WebSocket clients", labels=("channel",)),
+            "queued": GaugeMetricFamily(
+                "api_ws_queue_depth", "Pending outbound messages across clients", labels=("channel",)
+            ),
+            "max_queue_depth": GaugeMetricFamily(
+                "api_ws_max_queue_depth", "Deepest outbound queue of a single client", labels=("channel",)
+            ),
+        }
+        counters = {
+            "events": CounterMetricFamily("api_pubsub_events", "Pub/sub events received", labels=("channel",)),
+            "delivered": CounterMetricFamily(
+                "api_ws_messages_delivered", "WebSocket messages sent", labels=("channel",)
+            ),
+            "conflated": CounterMetricFamily(
+                "api_ws_messages_conflated", "Queued messages replaced by a newer update", labels=("channel",)
+            ),
+            "dropped": CounterMetricFamily(
+                "api_ws_messages_dropped", "Messages dropped because a client queue was full", labels=("channel",)
+            ),
+            "disconnected": CounterMetricFamily(
+                "api_ws_slow_disconnects", "Clients disconnected for falling behind", labels=("channel",)
+            ),
+        }
+        for hub in self.hubs:
+            stats = hub.stats()
+            for name, family in (gauges | counters).items():
+                family.add_metric((hub.channel,), stats[name])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+def observe_delivery(channel: str, received_at: float) -> None:
+    if received_at:
+        WS_DELIVERY_LAG.labels(channel).observe(time.monotonic() - received_at)
+
+
+def route_template(request: Request) -> str:
+    return getattr(request.scope.get("route"), "path", "unmatched")
+
+
+def observe_redis_profile(route: str, profile: RedisProfile) -> None:
+    for command, count in profile.commands.items():
+        REDIS_COMMANDS.labels(route, command).inc(count)
+    REDIS_COMMANDS_PER_REQUEST.labels(route).observe(profile.command_count)
+    REDIS_CALLS_PER_REQUEST.labels(route).observe(profile.calls)
+    REDIS_TIME_PER_REQUEST.labels(route).observe(profile.seconds)
+
+
+async def _time_request(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.labels(request.method, route_template(request), str(status)).observe(
+            time.perf_counter() - started
+        )
+
+
+async def metrics_endpoint(_: Request) -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrument(app: FastAPI, hubs: Iterable[Broadcaster]) -> None:
+    REGISTRY.register(HubCollector(hubs))
+    app.middleware("http")(_time_request)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
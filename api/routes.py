@@ -1,38 +1,57 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import json
+import logging
+import math
+import re
+from typing import Literal
 
-import pandas_market_calendars as mcal
-import pytz
 from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, WebSocket
-from redis.exceptions import RedisError
+from fastapi import APIRouter, HTTPException, Query, WebSocket
+from redis.exceptions import RedisError, ResponseError
 
+from broadcast import Broadcaster, SlowConsumerError
 from connection import db, db_sync
-from store import get_stocks, reset_demo_data, search_stocks
+from market_calendar import SessionCalendar
+from metrics import METRICS_ENABLED, observe_delivery
+from series import (
+    BAR_AGGREGATIONS,
+    COMPACTION_TIERS,
+    DEFAULT_BAR_POINTS,
+    bar_ranges,
+    last_values_between,
+    latest_bars,
+    latest_values,
+)
+from store import (
+    RESET_LOCK_KEY,
+    RESET_LOCK_MS,
+    RESET_STATUS_KEY,
+    STOCK_FIELDS,
+    SUMMARY_FIELDS,
+    clear_demo_series,
+    clear_demo_state,
+    get_reset_status,
+    get_stocks,
+    search_stocks,
+)
+from trending import TRENDING_KEY, TRENDING_SIZE, TrendingBroadcaster
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_BAR_POINTS = 5000
+RESOLUTION_PATTERN = re.compile(r"^(\d+)([smhd])$")
+RESOLUTION_UNITS = {"s": 1000, "m": 60 * 1000, "h": 60 * 60 * 1000, "d": 24 * 60 * 60 * 1000}
 
 router = APIRouter(prefix="/api/1.0")
+session_calendar = SessionCalendar()
+reset_task: asyncio.Task | None = None
 
 
 def get_last_market_close() -> datetime.datetime:
-    exchange = mcal.get_calendar("NASDAQ")
-    today = datetime.datetime.now(pytz.timezone("US/Eastern"))
-    valid_days = exchange.valid_days(
-        start_date=(today - relativedelta(days=14)).strftime("%Y-%m-%d"),
-        end_date=today.strftime("%Y-%m-%d"),
-    )
-    last_day = valid_days[-2]
-    close = exchange["market_close", last_day.strftime("%Y-%m-%d")]
-    return datetime.datetime(
-        year=last_day.year,
-        month=last_day.month,
-        day=last_day.day,
-        hour=close.hour,
-        minute=close.minute,
-        second=0,
-        microsecond=0,
-        tzinfo=pytz.timezone("US/Eastern"),
-    )
+    return session_calendar.last_close()
 
 
 def _normalize_series_points(points: list[tuple[int, float]] | list[list[int | float]]) -> list[list[int | float]]:
@@ -49,6 +68,16 @@ def _normalize_series_value(value: tuple[int, float] | list[int | float] | None)
     return [int(timestamp), float(point)]
 
 
+def _event_symbols(data: object) -> list[str]:
+    try:
+        payload = json.loads(str(data))
+    except ValueError:
+        payload = data
+    if isinstance(payload, list):
+        return [str(symbol).upper() for symbol in payload]
+    return [str(data).upper()]
+
+
 @router.post("/watchlist/{symbol}")
 async def watch(symbol: str) -> dict[str, str]:
     normalized = symbol.upper()
@@ -71,30 +100,99 @@ async def unwatch(symbol: str) -> dict[str, str]:
     return {"status": "Not in watchlist"}
 
 
+def _parse_fields(fields: str | None, allowed: tuple[str, ...] = STOCK_FIELDS) -> list[str] | None:
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if not requested or any(field not in allowed for field in requested):
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {fields!r}, expected any of {', '.join(allowed)}")
+    return requested
+
+
 @router.get("/watchlist")
-async def watchlist() -> list[dict]:
-    return get_stocks(db_sync, sorted(await db.smembers("watchlist")))
+async def watchlist(fields: str | None = None) -> list[dict]:
+    return get_stocks(db_sync, sorted(await db.smembers("watchlist")), _parse_fields(fields))
 
 
 @router.get("/search/{query}")
-async def search(query: str) -> list[dict]:
+async def search(query: str, fields: str | None = None) -> list[dict]:
     if not query:
         return []
-    return search_stocks(db_sync, query)
+    return search_stocks(db_sync, query, _parse_fields(fields, SUMMARY_FIELDS))
+
+
+def _parse_resolution(resolution: str) -> int:
+    match = RESOLUTION_PATTERN.match(resolution.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution: {resolution}")
+    return int(match.group(1)) * RESOLUTION_UNITS[match.group(2)]
+
+
+def _bar_tier(bucket_ms: int, exact: bool) -> tuple[str, int] | None:
+    for tier, tier_ms in sorted(COMPACTION_TIERS.items(), key=lambda item: item[1], reverse=True):
+        if tier_ms <= bucket_ms and (not exact or bucket_ms % tier_ms == 0):
+            return tier, tier_ms
+    return None
+
+
+def _range_bars(key: str, start: int, end: int, field: str, bucket_ms: int, tier_ms: int) -> list:
+    if not bucket_ms:
+        return db_sync.ts().range(key, str(start), str(end), count=DEFAULT_BAR_POINTS)
+    if bucket_ms == tier_ms:
+        return db_sync.ts().range(key, str(start), str(end), latest=True)
+    return db_sync.ts().range(
+        key,
+        str(start),
+        str(end),
+        aggregation_type=BAR_AGGREGATIONS[field],
+        bucket_size_msec=bucket_ms,
+        latest=bool(tier_ms),
+    )
 
 
-@router.get("/bars/{symbol}")
-async def bars(symbol: str) -> list[list[int | float]]:
+def _bar_plan(
+    start: int | None,
+    end: int | None,
+    resolution: str | None,
+    points: int | None,
+) -> tuple[int, int, int, tuple[str, int] | None]:
     now = datetime.datetime.now(datetime.timezone.utc)
-    start = now - relativedelta(days=7)
+    end = end if end is not None else int(now.timestamp() * 1000)
+    start = start if start is not None else int((now - relativedelta(days=7)).timestamp() * 1000)
+
+    bucket_ms = 0
+    tier = None
+    if resolution:
+        bucket_ms = _parse_resolution(resolution)
+        tier = _bar_tier(bucket_ms, exact=True)
+    elif points:
+        bucket_ms = math.ceil(max(end - start, 1) / points)
+        tier = _bar_tier(bucket_ms, exact=False)
+        if tier:
+            bucket_ms = math.ceil(bucket_ms / tier[1]) * tier[1]
+    return start, end, bucket_ms, tier
+
+
+@router.get("/bars/{symbol}")
+async def bars(
+    symbol: str,
+    field: Literal["open", "high", "low", "close", "volume"] = "close",
+    start: int | None = None,
+    end: int | None = None,
+    resolution: str | None = None,
+    points: int | None = Query(None, ge=1, le=MAX_BAR_POINTS),
+) -> list[list[int | float]]:
+    start, end, bucket_ms, tier = _bar_plan(start, end, resolution, points)
+    key = f"stocks:{symbol.upper()}:bars:{field}"
 
     try:
-        values = db_sync.ts().range(
-            f"stocks:{symbol.upper()}:bars:close",
-            str(int(start.timestamp() * 1000)),
-            str(int(now.timestamp() * 1000)),
-            count=30,
-        )
+        if tier:
+            try:
+                values = _range_bars(f"{key}:{tier[0]}", start, end, field, bucket_ms, tier[1])
+            except ResponseError:
+                values = _range_bars(key, start, end, field, bucket_ms, 0)
+        else:
+            values = _range_bars(key, start, end, field, bucket_ms, 0)
     except RedisError:
         return []
 
@@ -134,66 +232,164 @@ async def trade(symbol: str) -> list[int | float]:
     return _normalize_series_value(value)
 
 
+def _parse_symbols(symbols: str) -> list[str]:
+    return sorted({symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()})
+
+
+def _batch_trades(symbols: list[str]) -> dict[str, list[int | float]]:
+    try:
+        values = latest_values(db_sync, symbols, "trades", "price")
+    except RedisError:
+        values = {}
+    return {symbol: values.get(symbol, [0, 0]) for symbol in symbols}
+
+
+def _batch_closes(symbols: list[str]) -> dict[str, list[int | float]]:
+    time = get_last_market_close()
+    try:
+        values = last_values_between(
+            db_sync,
+            symbols,
+            "bars",
+            "close",
+            int((time - relativedelta(days=3)).timestamp() * 1000),
+            int(time.timestamp() * 1000),
+        )
+        missing = [symbol for symbol in symbols if symbol not in values]
+        if missing:
+            values.update(latest_values(db_sync, missing, "bars", "close"))
+    except RedisError:
+        values = {}
+    return {symbol: values.get(symbol, []) for symbol in symbols}
+
+
+@router.get("/trade")
+async def trades(symbols: str) -> dict[str, list[int | float]]:
+    return _batch_trades(_parse_symbols(symbols))
+
+
+@router.get("/close")
+async def closes(symbols: str) -> dict[str, list[int | float]]:
+    return _batch_closes(_parse_symbols(symbols))
+
+
+@router.get("/bars")
+async def bars_batch(
+    symbols: str,
+    field: Literal["open", "high", "low", "close", "volume"] = "close",
+    start: int | None = None,
+    end: int | None = None,
+    resolution: str | None = None,
+    points: int | None = Query(None, ge=1, le=MAX_BAR_POINTS),
+) -> dict[str, list[list[int | float]]]:
+    normalized = _parse_symbols(symbols)
+    start, end, bucket_ms, tier = _bar_plan(start, end, resolution, points)
+
+    try:
+        ranges = bar_ranges(db_sync, normalized, field, start, end, bucket_ms, tier)
+        missing = [symbol for symbol in normalized if symbol not in ranges]
+        if tier and missing:
+            ranges.update(bar_ranges(db_sync, missing, field, start, end, bucket_ms))
+    except RedisError:
+        ranges = {}
+    return {symbol: ranges.get(symbol, []) for symbol in normalized}
+
+
+@router.get("/dashboard")
+async def dashboard(fields: str | None = None) -> dict:
+    symbols = sorted(await db.smembers("watchlist"))
+    return {
+        "watchlist": get_stocks(db_sync, symbols, _parse_fields(fields)),
+        "trades": _batch_trades(symbols),
+        "closes": _batch_closes(symbols),
+        "trending": trending(),
+    }
+
+
 @router.get("/trending")
 def trending() -> list[str | int]:
     try:
-        return db_sync.topk().list("trending-stocks")
+        return db_sync.zrevrange(TRENDING_KEY, 0, TRENDING_SIZE - 1)
     except RedisError:
         return []
 
 
-@router.post("/demo/reset")
-async def reset_demo() -> dict[str, str]:
-    reset_demo_data(db_sync)
-    db_sync.publish("watchlist-updated", "reset")
-    db_sync.publish("trending-stocks", "updated")
-    return {"status": "Reset demo data"}
+async def _run_reset() -> None:
+    try:
+        progress = await clear_demo_series(db)
+        LOGGER.info("Demo reset finished: %s", progress)
+    except Exception as exc:
+        LOGGER.exception("Demo reset failed")
+        await db.hset(RESET_STATUS_KEY, mapping={"status": "failed", "error": repr(exc)})
+    finally:
+        await db.delete(RESET_LOCK_KEY)
 
 
-@router.websocket_route("/trending")
-async def trending_stocks_ws(websocket: WebSocket) -> None:
-    await websocket.accept()
-    pubsub = db.pubsub()
-    await pubsub.subscribe("trending-stocks")
+@router.post("/demo/reset", status_code=202)
+async def reset_demo() -> dict[str, object]:
+    global reset_task
+    await clear_demo_state(db)
+    await db.publish("watchlist-updated", "reset")
+    await db.publish("trending-stocks", "updated")
+
+    if await db.set(RESET_LOCK_KEY, "1", nx=True, px=RESET_LOCK_MS):
+        await db.delete(RESET_STATUS_KEY)
+        await db.hset(RESET_STATUS_KEY, "status", "queued")
+        reset_task = asyncio.create_task(_run_reset())
+    return {"status": "Reset demo data", "job": await get_reset_status(db)}
+
+
+@router.get("/demo/reset")
+async def reset_demo_status() -> dict[str, int | str]:
+    return await get_reset_status(db)
+
+
+async def _load_trades(data: str) -> list[object]:
+    return [{"symbol": symbol, "trade": value} for symbol, value in _batch_trades(_event_symbols(data)).items()]
+
+
+async def _load_bars(data: str) -> list[object]:
+    symbols = _event_symbols(data)
+    try:
+        bars = latest_bars(db_sync, symbols)
+    except RedisError:
+        bars = {}
+    return [{"symbol": symbol, "bar": bars[symbol]} for symbol in symbols if symbol in bars]
+
 
-    async for event in pubsub.listen():
-        if event["type"] == "subscribe":
-            continue
+trending_hub = TrendingBroadcaster(db)
+trade_hub = Broadcaster(db, "trade", _load_trades)
+bar_hub = Broadcaster(db, "bar", _load_bars)
+hubs = (trending_hub, trade_hub, bar_hub)
 
+
+async def _stream(websocket: WebSocket, hub: Broadcaster) -> None:
+    await websocket.accept()
+    async with hub.connect() as subscription:
         try:
-            payload = db_sync.topk().list("trending-stocks", withcount=True)
-        except RedisError:
-            payload = []
-        await websocket.send_json(payload)
+            while True:
+                await websocket.send_json(await subscription.get())
+                if METRICS_ENABLED:
+                    observe_delivery(hub.channel, subscription.received_at)
+        except SlowConsumerError:
+            await websocket.close(code=1013)
+
+
+@router.get("/ws/stats")
+async def websocket_stats() -> dict[str, dict[str, int]]:
+    return {hub.channel: hub.stats() for hub in hubs}
+
+
+@router.websocket_route("/trending")
+async def trending_stocks_ws(websocket: WebSocket) -> None:
+    await _stream(websocket, trending_hub)
 
 
 @router.websocket_route("/trade")
 async def trades_ws(websocket: WebSocket) -> None:
-    await websocket.accept()
-    pubsub = db.pubsub()
-    await pubsub.subscribe("trade")
-
-    async for event in pubsub.listen():
-        if event["type"] == "subscribe":
-            continue
-
-        symbol = str(event["data"]).upper()
-        await websocket.send_json(
-            {
-                "symbol": symbol,
-                "trade": await trade(symbol),
-            }
-        )
+    await _stream(websocket, trade_hub)
 
 
 @router.websocket_route("/bars")
 async def bars_ws(websocket: WebSocket) -> None:
-    await websocket.accept()
-    pubsub = db.pubsub()
-    await pubsub.subscribe("bar")
-
-    async for event in pubsub.listen():
-        if event["type"] == "subscribe":
-            continue
-
-        await websocket.send_text(str(event["data"]))
+    await _stream(websocket, bar_hub)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from redis import Redis
+
+DEFAULT_BAR_POINTS = 30
+BAR_AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+}
+COMPACTION_TIERS = {
+    "5m": 5 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+}
+
+
+def _filters(symbols: list[str], family: str, field: str, tier: str = "raw") -> list[str]:
+    return [f"symbol=({','.join(symbols)})", f"family={family}", f"field={field}", f"tier={tier}"]
+
+
+def _key_symbol(key: str) -> str:
+    return key.split(":")[1]
+
+
+def latest_values(db: Redis, symbols: list[str], family: str, field: str) -> dict[str, list[int | float]]:
+    if not symbols:
+        return {}
+
+    values: dict[str, list[int | float]] = {}
+    for item in db.ts().mget(_filters(symbols, family, field)):
+        for key, (_, timestamp, value) in item.items():
+            if timestamp is not None:
+                values[_key_symbol(key)] = [int(timestamp), float(value)]
+    return values
+
+
+def latest_bars(db: Redis, symbols: list[str]) -> dict[str, list[int | float]]:
+    if not symbols:
+        return {}
+
+    fields: dict[str, dict[str, tuple[int, float]]] = {}
+    for item in db.ts().mget(_filters(symbols, "bars", f"({','.join(BAR_AGGREGATIONS)})")):
+        for key, (_, timestamp, value) in item.items():
+            if timestamp is not None:
+                fields.setdefault(_key_symbol(key), {})[key.rsplit(":", 1)[1]] = (int(timestamp), float(value))
+
+    bars: dict[str, list[int | float]] = {}
+    for symbol, values in fields.items():
+        if len(values) == len(BAR_AGGREGATIONS) and len({timestamp for timestamp, _ in values.values()}) == 1:
+            bars[symbol] = [values["close"][0], *(values[field][1] for field in BAR_AGGREGATIONS)]
+    return bars
+
+
+def last_values_between(
+    db: Redis,
+    symbols: list[str],
+    family: str,
+    field: str,
+    start: int,
+    end: int,
+) -> dict[str, list[int | float]]:
+    if not symbols:
+        return {}
+
+    values: dict[str, list[int | float]] = {}
+    for item in db.ts().mrevrange(str(start), str(end), _filters(symbols, family, field), count=1):
+        for key, (_, points) in item.items():
+            if points:
+                timestamp, value = points[0]
+                values[_key_symbol(key)] = [int(timestamp), float(value)]
+    return values
+
+
+def bar_ranges(
+    db: Redis,
+    symbols: list[str],
+    field: str,
+    start: int,
+    end: int,
+    bucket_ms: int = 0,
+    tier: tuple[str, int] | None = None,
+) -> dict[str, list[list[int | float]]]:
+    if not symbols:
+        return {}
+
+    tier_name, tier_ms = tier or ("raw", 0)
+    filters = _filters(symbols, "bars", field, tier_name)
+    if not bucket_ms:
+        results = db.ts().mrange(str(start), str(end), filters, count=DEFAULT_BAR_POINTS)
+    elif bucket_ms == tier_ms:
+        results = db.ts().mrange(str(start), str(end), filters, latest=True)
+    else:
+        results = db.ts().mrange(
+            str(start),
+            str(end),
+            filters,
+            aggregation_type=BAR_AGGREGATIONS[field],
+            bucket_size_msec=bucket_ms,
+            latest=bool(tier_ms),
+        )
+
+    ranges: dict[str, list[list[int | float]]] = {}
+    for item in results:
+        for key, (_, points) in item.items():
+            ranges[_key_symbol(key)] = [[int(timestamp), float(value)] for timestamp, value in points]
+    return ranges
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import json
+import os
 import re
+import time
+from collections.abc import AsyncIterator, Sequence
 
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from redis.commands.json.path import Path
 from redis.commands.search.field import TextField
 from redis.commands.search.index_definition import IndexDefinition, IndexType
@@ -15,6 +20,16 @@ INDEX_NAME = "stocks:index"
 STOCK_KEY_PREFIX = "stocks:"
 MAX_SEARCH_RESULTS = 100
 SEARCH_ESCAPE = re.compile(r"([^A-Z0-9])")
+STOCK_FIELDS = tuple(Stock.model_fields)
+SUMMARY_FIELDS = tuple(field for field in STOCK_FIELDS if field != "news")
+TYPEAHEAD_FIELDS = ("symbol", "name")
+NEWS_LIMIT = int(os.getenv("NEWS_LIMIT", "50"))
+NEWS_IDS_LIMIT = int(os.getenv("NEWS_IDS_LIMIT", "1000"))
+RESET_BATCH_SIZE = int(os.getenv("RESET_BATCH_SIZE", "500"))
+RESET_SCAN_COUNT = 1000
+RESET_STATUS_KEY = "demo-reset"
+RESET_LOCK_KEY = "demo-reset:lock"
+RESET_LOCK_MS = 10 * 60 * 1000
 
 
 def make_stock_key(symbol: str) -> str:
@@ -29,6 +44,18 @@ def _escape_search_term(query: str) -> str:
     return SEARCH_ESCAPE.sub(r"\\\1", query.strip().upper())
 
 
+def _search_query(query: str) -> str:
+    terms = [_escape_search_term(term) for term in query.split()]
+    terms = [term for term in terms if term]
+    if not terms:
+        return ""
+
+    name_clause = "@name:(" + " ".join(f"{term}*" for term in terms) + ")"
+    if len(terms) > 1:
+        return name_clause
+    return f"(@symbol:{terms[0]}*) | ({name_clause})"
+
+
 def ensure_index(db: Redis) -> None:
     try:
         db.ft(INDEX_NAME).create_index(
@@ -65,66 +92,162 @@ def get_stock(db: Redis, symbol: str) -> dict | None:
     return Stock.model_validate(document).model_dump(mode="json")
 
 
-def get_stocks(db: Redis, symbols: list[str]) -> list[dict]:
+def _project(document: dict | list | None, fields: Sequence[str]) -> dict | None:
+    if len(fields) == 1:
+        document = {f"$.{fields[0]}": document}
+    if not document or not any(document.values()):
+        return None
+    return {field: document[f"$.{field}"][0] for field in fields if document.get(f"$.{field}")}
+
+
+def get_stocks(db: Redis, symbols: list[str], fields: Sequence[str] | None = None) -> list[dict]:
+    keys = [make_stock_key(symbol) for symbol in sorted({_normalize_symbol(symbol) for symbol in symbols if symbol})]
+    if not keys:
+        return []
+
+    if fields is not None:
+        fields = [field for field in fields if field in STOCK_FIELDS] or None
+    if fields is None:
+        documents = db.json().mget(keys, Path.root_path())
+        return [Stock.model_validate(document).model_dump(mode="json") for document in documents if document]
+
+    pipe = db.pipeline(transaction=False)
+    for key in keys:
+        pipe.json().get(key, *(f"$.{field}" for field in fields))
     stocks: list[dict] = []
-    for symbol in sorted({_normalize_symbol(symbol) for symbol in symbols if symbol}):
-        stock = get_stock(db, symbol)
+    for document in pipe.execute():
+        stock = _project(document, fields)
         if stock:
             stocks.append(stock)
     return stocks
 
 
-def search_stocks(db: Redis, query: str) -> list[dict]:
-    normalized = _escape_search_term(query)
-    if not normalized:
+def search_stocks(db: Redis, query: str, fields: Sequence[str] | None = None) -> list[dict]:
+    search_query = _search_query(query)
+    if not search_query:
         return []
 
     search = (
-        Query(f"@symbol:{normalized}*")
+        Query(search_query)
         .sort_by("symbol", asc=True)
         .paging(0, MAX_SEARCH_RESULTS)
     )
+    if fields is not None:
+        fields = [field for field in fields if field in SUMMARY_FIELDS] or None
+    for field in fields or ():
+        search.return_field(f"$.{field}", as_field=field)
+
     results = db.ft(INDEX_NAME).search(search)
-    stocks: list[dict] = []
+    if fields is not None:
+        return [{field: getattr(result, field, "") for field in fields} for result in results.docs]
 
-    for result in results.docs:
-        stock = get_stock(db, result.id.removeprefix(STOCK_KEY_PREFIX))
-        if stock:
-            stocks.append(stock)
+    return [Stock.model_validate(json.loads(result.json)).model_dump(mode="json") for result in results.docs]
 
-    return stocks
 
+def make_news_ids_key(symbol: str) -> str:
+    return f"{make_stock_key(symbol)}:news:ids"
+
+
+def add_news(db: Redis, symbol: str, items: list[dict | News], limit: int = NEWS_LIMIT) -> int | None:
+    if not items:
+        return 0
+
+    items = [(item if isinstance(item, News) else News.model_validate(item)).model_dump(mode="json") for item in items]
+    key = make_stock_key(symbol)
+    ids_key = make_news_ids_key(symbol)
+    now_us = time.time_ns() // 1000
+    pipe = db.pipeline(transaction=False)
+    pipe.exists(ids_key)
+    pipe.json().arrlen(key, "$.news")
+    for offset, item in enumerate(items):
+        pipe.zadd(ids_key, {item["id"]: now_us + offset}, nx=True)
+    seeded, lengths, *added = pipe.execute(raise_on_error=False)
 
-def add_news(db: Redis, symbol: str, items: list[dict | News]) -> dict | None:
-    stock_data = get_stock(db, symbol)
-    if stock_data is None:
+    if lengths is None or isinstance(lengths, ResponseError):
+        db.delete(ids_key)
         return None
 
-    stock = Stock.model_validate(stock_data)
-    seen_ids = {news.id for news in stock.news}
-    for item in items:
-        news_item = item if isinstance(item, News) else News.model_validate(item)
-        if news_item.id not in seen_ids:
-            stock.news.append(news_item)
-            seen_ids.add(news_item.id)
-
-    save_stock(db, stock)
-    return stock.model_dump(mode="json")
-
-
-def reset_demo_data(db: Redis) -> None:
-    series_keys = list(db.scan_iter(match="stocks:*:*"))
-    if series_keys:
-        db.delete(*series_keys)
-
-    db.delete("watchlist", "trending-stocks")
-
-    for key in db.scan_iter(match="stocks:*"):
-        if key.count(":") != 1:
-            continue
-        document = db.json().get(key)
-        if not document:
-            continue
-        if document.get("news"):
-            document["news"] = []
-            db.json().set(key, Path.root_path(), document)
+    length = lengths[0] if lengths and lengths[0] is not None else 0
+    existing_ids: list[str] = []
+    if not seeded and length:
+        existing_ids = db.json().get(key, "$.news[*].id") or []
+        db.zadd(ids_key, {news_id: offset for offset, news_id in enumerate(existing_ids)})
+
+    new_items = [item for item, is_new in zip(items, added) if is_new == 1 and item["id"] not in existing_ids]
+    if not new_items:
+        return 0
+
+    pipe = db.pipeline(transaction=False)
+    if lengths and lengths[0] is not None:
+        pipe.json().arrappend(key, "$.news", *new_items)
+    else:
+        pipe.json().set(key, "$.news", new_items)
+    if length + len(new_items) > limit:
+        pipe.json().arrtrim(key, "$.news", -limit, -1)
+    pipe.zremrangebyrank(ids_key, 0, -max(limit, NEWS_IDS_LIMIT) - 1)
+    pipe.execute()
+    return len(new_items)
+
+
+async def clear_demo_state(db: AsyncRedis) -> None:
+    trending_keys = [key async for key in db.scan_iter(match="trending-stocks:*")]
+    await db.delete("watchlist", "trending-stocks", *trending_keys)
+
+
+async def _update_reset_status(db: AsyncRedis, **fields: int | str) -> None:
+    await db.hset(RESET_STATUS_KEY, mapping=fields)
+
+
+async def get_reset_status(db: AsyncRedis) -> dict[str, int | str]:
+    status = await db.hgetall(RESET_STATUS_KEY)
+    return {field: value if field in ("status", "error") else int(value) for field, value in status.items()}
+
+
+async def _batches(keys: AsyncIterator[str], size: int) -> AsyncIterator[list[str]]:
+    batch: list[str] = []
+    async for key in keys:
+        batch.append(key)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def clear_demo_series(db: AsyncRedis, batch_size: int = RESET_BATCH_SIZE) -> dict[str, int]:
+    progress = {"series_unlinked": 0, "documents_scanned": 0, "news_cleared": 0}
+    await db.delete(RESET_STATUS_KEY)
+    await _update_reset_status(db, status="running", started_at=int(time.time() * 1000), **progress)
+
+    async for batch in _batches(db.scan_iter(match=f"{STOCK_KEY_PREFIX}*:*", count=RESET_SCAN_COUNT), batch_size):
+        progress["series_unlinked"] += await db.unlink(*batch)
+        await _update_reset_status(db, **progress)
+
+    documents = db.scan_iter(match=f"{STOCK_KEY_PREFIX}*", count=RESET_SCAN_COUNT, _type="ReJSON-RL")
+    async for batch in _batches(documents, batch_size):
+        keys = [key for key in batch if key.count(":") == 1]
+        pipe = db.pipeline(transaction=False)
+        for key in keys:
+            pipe.json().arrlen(key, "$.news")
+        lengths = await pipe.execute(raise_on_error=False)
+
+        pipe = db.pipeline(transaction=False)
+        cleared = 0
+        for key, length in zip(keys, lengths):
+            if isinstance(length, list) and length and length[0]:
+                pipe.json().set(key, "$.news", [])
+                cleared += 1
+        if cleared:
+            await pipe.execute()
+
+        progress["documents_scanned"] += len(keys)
+        progress["news_cleared"] += cleared
+        await _update_reset_status(db, **progress)
+
+    await _update_reset_status(db, status="done", finished_at=int(time.time() * 1000), **progress)
+    return progress
+
+
+async def reset_demo_data(db: AsyncRedis, batch_size: int = RESET_BATCH_SIZE) -> dict[str, int]:
+    await clear_demo_state(db)
+    return await clear_demo_series(db, batch_size)
@@ -24,12 +24,12 @@ async def redis_client() -> Redis:
     keys = client.keys("stocks:*")
     if keys:
         client.delete(*keys)
-    client.delete("watchlist", "trending-stocks")
+    client.delete("watchlist", "trending-stocks", "demo-reset", "demo-reset:lock")
     yield client
     keys = client.keys("stocks:*")
     if keys:
         client.delete(*keys)
-    client.delete("watchlist", "trending-stocks")
+    client.delete("watchlist", "trending-stocks", "demo-reset", "demo-reset:lock")
     client.close()
 
 
@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from broadcast import Broadcaster, SlowConsumerError, Subscription
+from connection import db
+
+
+async def test_broadcaster_loads_once_and_fans_out():
+    loads: list[str] = []
+
+    async def loader(data: str) -> list[object]:
+        loads.append(data)
+        return [data.upper()]
+
+    hub = Broadcaster(db, "test-broadcast", loader)
+
+    async with hub.connect() as first, hub.connect() as second:
+        assert hub.connection_count == 2
+        await asyncio.sleep(0.1)
+        await db.publish("test-broadcast", "aapl")
+
+        assert await asyncio.wait_for(first.get(), 2) == "AAPL"
+        assert await asyncio.wait_for(second.get(), 2) == "AAPL"
+        assert loads == ["aapl"]
+
+    assert hub.connection_count == 0
+    assert hub.task is None
+
+
+async def test_broadcaster_keeps_listening_after_a_failed_load():
+    async def loader(data: str) -> list[object]:
+        if data == "bad":
+            raise ValueError("Malformed event")
+        return [data.upper()]
+
+    hub = Broadcaster(db, "test-broadcast-errors", loader)
+
+    async with hub.connect() as subscription:
+        await asyncio.sleep(0.1)
+        await db.publish("test-broadcast-errors", "bad")
+        await db.publish("test-broadcast-errors", "msft")
+
+        assert await asyncio.wait_for(subscription.get(), 2) == "MSFT"
+        assert hub.events == 2
+        assert not hub.task.done()
+
+
+async def test_subscription_conflates_per_symbol_and_drops_when_full():
+    subscription = Subscription(limit=2, disconnect_drops=3)
+
+    subscription.put("AAPL", {"symbol": "AAPL", "trade": [1, 1.0]})
+    subscription.put("MSFT", {"symbol": "MSFT", "trade": [1, 2.0]})
+    subscription.put("AAPL", {"symbol": "AAPL", "trade": [2, 1.5]})
+    assert not subscription.put("NVDA", {"symbol": "NVDA", "trade": [2, 3.0]})
+
+    assert subscription.depth == 2
+    assert (subscription.conflated, subscription.dropped) == (1, 1)
+    assert await subscription.get() == {"symbol": "AAPL", "trade": [2, 1.5]}
+    assert await subscription.get() == {"symbol": "MSFT", "trade": [1, 2.0]}
+
+
+async def test_subscription_disconnects_after_consecutive_drops():
+    subscription = Subscription(limit=1, disconnect_drops=2)
+    subscription.put("AAPL", "AAPL")
+    subscription.put("MSFT", "MSFT")
+    subscription.put("NVDA", "NVDA")
+
+    assert subscription.closed
+    with pytest.raises(SlowConsumerError):
+        await subscription.get()
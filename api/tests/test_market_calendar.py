@@ -0,0 +1,41 @@
+import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from market_calendar import EASTERN, SessionCalendar
+
+
+def _eastern(value: str) -> datetime.datetime:
+    return EASTERN.localize(datetime.datetime.fromisoformat(value))
+
+
+def test_last_close_is_the_session_before_the_latest_trading_day():
+    calendar = SessionCalendar()
+
+    assert calendar.last_close(_eastern("2026-10-16T08:00")) == _eastern("2026-10-15T16:00")
+    assert calendar.last_close(_eastern("2026-10-16T12:00")) == _eastern("2026-10-15T16:00")
+    assert calendar.last_close(_eastern("2026-10-16T18:00")) == _eastern("2026-10-15T16:00")
+    assert calendar.last_close(_eastern("2026-10-18T12:00")) == _eastern("2026-10-15T16:00")
+    assert calendar.last_close(_eastern("2026-10-19T09:00")) == _eastern("2026-10-16T16:00")
+    assert calendar.last_close(_eastern("2026-10-19T12:00")) == _eastern("2026-10-16T16:00")
+
+
+def test_last_close_skips_holidays():
+    calendar = SessionCalendar()
+
+    assert calendar.last_close(_eastern("2026-11-26T12:00")) == _eastern("2026-11-24T16:00")
+    assert calendar.last_close(_eastern("2026-11-27T08:00")) == _eastern("2026-11-25T16:00")
+    assert calendar.last_close(_eastern("2026-11-27T10:00")) == _eastern("2026-11-25T16:00")
+
+
+def test_last_close_uses_the_prebuilt_schedule_until_refreshed():
+    calendar = SessionCalendar()
+    calendar.refresh(_eastern("2026-11-27T10:00"))
+
+    calendar.last_close(_eastern("2026-11-28T10:00"))
+    assert calendar.built_for == datetime.date(2026, 11, 27)
+
+    calendar.refresh(_eastern("2026-11-28T10:00"))
+    assert calendar.built_for == datetime.date(2026, 11, 28)
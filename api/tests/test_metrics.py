@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+async def test_metrics_report_route_latency_and_websocket_hubs(client, seeded_stock):
+    await client.get("/api/1.0/watchlist")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'api_request_duration_seconds_count{method="GET",route="/api/1.0/watchlist",status="200"}' in response.text
+    assert 'api_ws_clients{channel="trade"} 0.0' in response.text
+    assert 'api_ws_messages_dropped_total{channel="bar"}' in response.text
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from connection import db, db_sync
+from profiling import ProfiledAsyncRedis, ProfiledRedis, profile_redis
+
+
+async def test_profiled_clients_record_commands_per_scope(redis_client):
+    client = ProfiledRedis(connection_pool=db_sync.connection_pool)
+    async_client = ProfiledAsyncRedis(connection_pool=db.connection_pool)
+
+    client.sadd("watchlist", "AAPL")
+    with profile_redis() as profile:
+        client.smembers("watchlist")
+        pipe = client.pipeline(transaction=False)
+        pipe.exists("stocks:AAPL")
+        pipe.exists("stocks:MSFT")
+        pipe.execute()
+        await async_client.sismember("watchlist", "AAPL")
+
+    assert profile.commands == {"SMEMBERS": 1, "EXISTS": 2, "SISMEMBER": 1}
+    assert profile.calls == 3
+    assert profile.seconds > 0
+    assert profile.headers()["X-Redis-Commands"] == "4"
+    assert profile.headers()["X-Redis-Command-Names"].startswith("EXISTS=2")
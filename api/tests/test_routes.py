@@ -4,6 +4,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+import routes
 from connection import db_sync
 
 
@@ -32,8 +33,7 @@ async def test_market_data_routes(client, seeded_stock):
     db_sync.ts().create("stocks:AAPL:bars:close", duplicate_policy="last")
     db_sync.ts().add("stocks:AAPL:trades:price", now, 190.5)
     db_sync.ts().add("stocks:AAPL:bars:close", now, 189.25)
-    db_sync.topk().reserve("trending-stocks", 12, 50, 4, 0.9)
-    db_sync.topk().add("trending-stocks", "AAPL")
+    db_sync.zadd("trending-stocks", {"AAPL": 3.0, "MSFT": 1.0})
 
     bars = await client.get("/api/1.0/bars/AAPL")
     trade = await client.get("/api/1.0/trade/AAPL")
@@ -47,7 +47,64 @@ async def test_market_data_routes(client, seeded_stock):
     assert bars.json()
     assert trade.json()[1] == 190.5
     assert close.json()[1] == 189.25
-    assert trending.json()[0] == "AAPL"
+    assert trending.json() == ["AAPL", "MSFT"]
+
+
+async def test_bars_route_downsamples_from_compaction_tier(client, seeded_stock):
+    db_sync.ts().create("stocks:AAPL:bars:close", duplicate_policy="last")
+    db_sync.ts().create("stocks:AAPL:bars:close:5m", duplicate_policy="last")
+    db_sync.ts().createrule("stocks:AAPL:bars:close", "stocks:AAPL:bars:close:5m", "last", 300_000)
+    for minute in range(21):
+        db_sync.ts().add("stocks:AAPL:bars:close", minute * 60_000, 100 + minute)
+
+    tier = await client.get("/api/1.0/bars/AAPL", params={"start": 0, "end": 1_199_999, "resolution": "5m"})
+    wider = await client.get("/api/1.0/bars/AAPL", params={"start": 0, "end": 1_199_999, "resolution": "10m"})
+    fitted = await client.get("/api/1.0/bars/AAPL", params={"start": 0, "end": 1_199_999, "points": 2})
+    invalid = await client.get("/api/1.0/bars/AAPL", params={"resolution": "soon"})
+
+    assert tier.json() == [[0, 104.0], [300_000, 109.0], [600_000, 114.0], [900_000, 119.0]]
+    assert wider.json() == [[0, 109.0], [600_000, 119.0]]
+    assert fitted.json() == wider.json()
+    assert invalid.status_code == 400
+
+
+async def test_batch_market_data_routes(client, seeded_stock):
+    now = int(time.time() * 1000)
+    for symbol in ("AAPL", "MSFT"):
+        for family, field in (("trades", "price"), ("bars", "close")):
+            db_sync.ts().create(
+                f"stocks:{symbol}:{family}:{field}",
+                duplicate_policy="last",
+                labels={"symbol": symbol, "family": family, "field": field, "tier": "raw"},
+            )
+    db_sync.ts().add("stocks:AAPL:trades:price", now, 190.5)
+    db_sync.ts().add("stocks:AAPL:bars:close", now, 189.25)
+    db_sync.ts().add("stocks:MSFT:bars:close", now, 410.0)
+    db_sync.sadd("watchlist", "AAPL")
+
+    trades = await client.get("/api/1.0/trade", params={"symbols": "aapl,MSFT"})
+    closes = await client.get("/api/1.0/close", params={"symbols": "AAPL,MSFT,NONE"})
+    bars = await client.get("/api/1.0/bars", params={"symbols": "AAPL,MSFT"})
+    dashboard = await client.get("/api/1.0/dashboard", params={"fields": "symbol,name"})
+
+    assert trades.json() == {"AAPL": [now, 190.5], "MSFT": [0, 0]}
+    assert closes.json() == {"AAPL": [now, 189.25], "MSFT": [now, 410.0], "NONE": []}
+    assert bars.json() == {"AAPL": [[now, 189.25]], "MSFT": [[now, 410.0]]}
+    assert dashboard.json()["watchlist"] == [{"symbol": "AAPL", "name": "Apple Inc."}]
+    assert dashboard.json()["trades"] == {"AAPL": [now, 190.5]}
+
+
+async def test_routes_reject_empty_or_unknown_fields(client, seeded_stock):
+    db_sync.sadd("watchlist", "AAPL")
+
+    empty = await client.get("/api/1.0/watchlist", params={"fields": ""})
+    unknown = await client.get("/api/1.0/dashboard", params={"fields": "symbol,price"})
+    search = await client.get("/api/1.0/search/AAP", params={"fields": "news"})
+
+    assert empty.status_code == 400
+    assert unknown.status_code == 400
+    assert search.status_code == 400
+    assert "symbol" in unknown.json()["detail"]
 
 
 async def test_reset_demo_route(client, seeded_stock):
@@ -74,8 +131,43 @@ async def test_reset_demo_route(client, seeded_stock):
 
     response = await client.post("/api/1.0/demo/reset")
 
-    assert response.status_code == 200
+    assert response.status_code == 202
     assert response.json()["status"] == "Reset demo data"
     assert db_sync.smembers("watchlist") == set()
+
+    await routes.reset_task
+    status = await client.get("/api/1.0/demo/reset")
+
+    assert status.json()["status"] == "done"
+    assert status.json()["news_cleared"] == 1
     assert db_sync.exists("stocks:AAPL:trades:price") == 0
     assert db_sync.json().get("stocks:AAPL")["news"] == []
+
+
+async def test_failed_reset_records_the_error_and_releases_the_lock(client, seeded_stock, monkeypatch):
+    async def broken_reset(db):
+        raise ValueError("Unexpected document")
+
+    monkeypatch.setattr(routes, "clear_demo_series", broken_reset)
+
+    response = await client.post("/api/1.0/demo/reset")
+    await routes.reset_task
+    status = await client.get("/api/1.0/demo/reset")
+
+    assert response.status_code == 202
+    assert status.json() == {"status": "failed", "error": "ValueError('Unexpected document')"}
+    assert db_sync.exists("demo-reset:lock") == 0
+
+
+async def test_bar_events_carry_latest_ohlcv(seeded_stock):
+    for field, value in (("open", 190.0), ("high", 192.5), ("low", 189.5), ("close", 191.25), ("volume", 1200)):
+        db_sync.ts().create(
+            f"stocks:AAPL:bars:{field}",
+            duplicate_policy="last",
+            labels={"symbol": "AAPL", "family": "bars", "field": field, "tier": "raw"},
+        )
+        db_sync.ts().add(f"stocks:AAPL:bars:{field}", 60_000, value)
+
+    payloads = await routes._load_bars('["AAPL", "MSFT"]')
+
+    assert payloads == [{"symbol": "AAPL", "bar": [60_000, 190.0, 192.5, 189.5, 191.25, 1200.0]}]
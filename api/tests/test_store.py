@@ -1,4 +1,17 @@
-from store import get_stock, reset_demo_data, search_stocks
+import os
+
+from redis.asyncio import Redis as AsyncRedis
+
+from store import (
+    SUMMARY_FIELDS,
+    TYPEAHEAD_FIELDS,
+    add_news,
+    get_stock,
+    get_stocks,
+    reset_demo_data,
+    save_stock,
+    search_stocks,
+)
 
 
 async def test_searches_by_symbol(redis_client, seeded_stock):
@@ -8,6 +21,19 @@ async def test_searches_by_symbol(redis_client, seeded_stock):
     assert results[0]["symbol"] == seeded_stock["symbol"]
 
 
+async def test_searches_by_name_prefix(redis_client, seeded_stock):
+    results = search_stocks(redis_client, "appl")
+
+    assert [result["symbol"] for result in results] == ["AAPL"]
+    assert results[0]["news"] == []
+
+
+async def test_search_returns_typeahead_fields_from_index(redis_client, seeded_stock):
+    results = search_stocks(redis_client, "AAP", TYPEAHEAD_FIELDS)
+
+    assert results == [{"symbol": "AAPL", "name": "Apple Inc."}]
+
+
 async def test_get_stock(redis_client, seeded_stock):
     result = get_stock(redis_client, seeded_stock["symbol"])
 
@@ -15,14 +41,45 @@ async def test_get_stock(redis_client, seeded_stock):
     assert result["name"] == seeded_stock["name"]
 
 
+async def test_get_stocks_loads_documents_and_projections(redis_client, seeded_stock):
+    save_stock(redis_client, {**seeded_stock, "pk": "MSFT", "symbol": "MSFT", "name": "Microsoft Corp."})
+
+    stocks = get_stocks(redis_client, ["msft", "AAPL", "MISSING"])
+    summaries = get_stocks(redis_client, ["msft", "AAPL", "MISSING"], SUMMARY_FIELDS)
+    names = get_stocks(redis_client, ["AAPL"], ["name"])
+
+    assert [stock["symbol"] for stock in stocks] == ["AAPL", "MSFT"]
+    assert stocks[0]["news"] == []
+    assert [stock["symbol"] for stock in summaries] == ["AAPL", "MSFT"]
+    assert "news" not in summaries[0]
+    assert names == [{"name": "Apple Inc."}]
+    assert get_stocks(redis_client, ["AAPL"], ["price"]) == get_stocks(redis_client, ["AAPL"])
+
+
+async def test_add_news_appends_only_unseen_items_and_caps_length(redis_client, seeded_stock):
+    first = {"id": "aapl-1", "headline": "First"}
+    second = {"id": "aapl-2", "headline": "Second"}
+    third = {"id": "aapl-3", "headline": "Third"}
+
+    assert add_news(redis_client, "AAPL", [first, second, first], limit=2) == 2
+    assert add_news(redis_client, "AAPL", [first, second], limit=2) == 0
+    assert add_news(redis_client, "AAPL", [third], limit=2) == 1
+    assert add_news(redis_client, "AAPL", [first], limit=2) == 0
+    assert add_news(redis_client, "MISSING", [first]) is None
+
+    news = get_stock(redis_client, "AAPL")["news"]
+    assert [item["id"] for item in news] == ["aapl-2", "aapl-3"]
+    assert redis_client.zrange("stocks:AAPL:news:ids", 0, -1) == ["aapl-1", "aapl-2", "aapl-3"]
+
+
 async def test_reset_demo_data_clears_runtime_state(redis_client, seeded_stock):
     redis_client.sadd("watchlist", seeded_stock["symbol"])
     redis_client.ts().create("stocks:AAPL:trades:price", duplicate_policy="last")
     redis_client.ts().create("stocks:AAPL:bars:close", duplicate_policy="last")
     redis_client.ts().add("stocks:AAPL:trades:price", 1000, 190.5)
     redis_client.ts().add("stocks:AAPL:bars:close", 1000, 189.25)
-    redis_client.topk().reserve("trending-stocks", 12, 50, 4, 0.9)
-    redis_client.topk().add("trending-stocks", seeded_stock["symbol"])
+    redis_client.zadd("trending-stocks", {seeded_stock["symbol"]: 1.0})
+    redis_client.zadd("trending-stocks:100", {seeded_stock["symbol"]: 1.0})
 
     stock = get_stock(redis_client, seeded_stock["symbol"])
     stock["news"] = [
@@ -41,10 +98,15 @@ async def test_reset_demo_data_clears_runtime_state(redis_client, seeded_stock):
     ]
     redis_client.json().set("stocks:AAPL", "$", stock)
 
-    reset_demo_data(redis_client)
+    db = AsyncRedis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+    progress = await reset_demo_data(db, batch_size=1)
+    await db.aclose()
 
+    assert progress["series_unlinked"] == 2
+    assert progress["news_cleared"] == 1
+    assert redis_client.hget("demo-reset", "status") == "done"
     assert redis_client.smembers("watchlist") == set()
-    assert redis_client.exists("trending-stocks") == 0
+    assert redis_client.exists("trending-stocks", "trending-stocks:100") == 0
     assert redis_client.exists("stocks:AAPL:trades:price") == 0
     assert redis_client.exists("stocks:AAPL:bars:close") == 0
     assert get_stock(redis_client, seeded_stock["symbol"])["news"] == []
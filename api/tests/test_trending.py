@@ -0,0 +1,53 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from connection import db, db_sync
+from trending import TrendingBroadcaster
+
+RANKING = {"AAPL": 6.0, "MSFT": 5.0, "NVDA": 4.0, "AMZN": 3.0, "META": 2.0, "TSLA": 1.0}
+
+
+async def test_trending_snapshot_versions_and_diffs(redis_client):
+    hub = TrendingBroadcaster(db, refresh_ms=0)
+    db_sync.zadd("trending-stocks", RANKING)
+
+    [snapshot] = await hub.refresh()
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["version"] == 1
+    assert snapshot["ranking"][:4] == ["AAPL", 6.0, "MSFT", 5.0]
+
+    db_sync.zadd("trending-stocks", {"AAPL": 6.5})
+    assert await hub.refresh() == []
+    assert hub.version == 1
+    assert hub.snapshot()["version"] == 1
+    assert hub.snapshot()["ranking"] == ["AAPL", 6.5, *snapshot["ranking"][2:]]
+
+    db_sync.zadd("trending-stocks", {"TSLA": 9.0})
+    db_sync.zrem("trending-stocks", "META")
+
+    assert await hub.refresh() == [
+        {"type": "diff", "version": 2, "base": 1, "set": {"TSLA": 9.0, "AAPL": 6.5}, "remove": ["META"]}
+    ]
+    assert hub.snapshot()["ranking"][:2] == ["TSLA", 9.0]
+
+
+async def test_trending_hub_sends_snapshot_then_rate_limited_diffs(redis_client):
+    hub = TrendingBroadcaster(db, refresh_ms=200)
+    db_sync.zadd("trending-stocks", RANKING)
+
+    async with hub.connect() as queue:
+        snapshot = await asyncio.wait_for(queue.get(), 2)
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["ranking"][0] == "AAPL"
+
+        db_sync.zadd("trending-stocks", {"TSLA": 9.0})
+        assert await hub._on_event("updated") == []
+        assert await hub._on_event("updated") == []
+
+        update = await asyncio.wait_for(queue.get(), 2)
+        assert update["version"] == snapshot["version"] + 1
+        assert update["set"] == {"TSLA": 9.0}
+        assert queue.empty()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from broadcast import Broadcaster, Subscription
+
+LOGGER = logging.getLogger(__name__)
+
+TRENDING_KEY = "trending-stocks"
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", "12"))
+TRENDING_REFRESH_MS = int(os.getenv("TRENDING_REFRESH_MS", "1000"))
+
+Ranking = list[tuple[str, float]]
+
+
+def _flatten(ranking: Ranking) -> list[str | float]:
+    return [item for entry in ranking for item in entry]
+
+
+class TrendingBroadcaster(Broadcaster):
+    def __init__(self, db: AsyncRedis, size: int = TRENDING_SIZE, refresh_ms: int = TRENDING_REFRESH_MS) -> None:
+        super().__init__(db, TRENDING_KEY, self._on_event)
+        self.size = size
+        self.refresh_ms = max(refresh_ms, 0)
+        self.version = 0
+        self.ranking: Ranking = []
+        self.published: Ranking = []
+        self.refreshed_at: float | None = None
+        self.timer: asyncio.Task | None = None
+
+    def snapshot(self) -> dict[str, object]:
+        return {"type": "snapshot", "version": self.version, "ranking": _flatten(self.ranking)}
+
+    def _cooldown(self) -> float:
+        if self.refreshed_at is None:
+            return 0.0
+        return self.refresh_ms / 1000 - (time.monotonic() - self.refreshed_at)
+
+    def _message(self, previous: Ranking) -> dict[str, object]:
+        previous_scores, scores = dict(previous), dict(self.ranking)
+        diff = {
+            "type": "diff",
+            "version": self.version,
+            "base": self.version - 1,
+            "set": {symbol: score for symbol, score in self.ranking if previous_scores.get(symbol) != score},
+            "remove": [symbol for symbol in previous_scores if symbol not in scores],
+        }
+        snapshot = self.snapshot()
+        return diff if len(json.dumps(diff)) < len(json.dumps(snapshot)) else snapshot
+
+    async def refresh(self) -> list[object]:
+        self.refreshed_at = time.monotonic()
+        ranking = sorted(
+            (
+                (symbol, round(score, 2))
+                for symbol, score in await self.db.zrevrange(TRENDING_KEY, 0, self.size - 1, withscores=True)
+            ),
+            key=lambda entry: (-entry[1], entry[0]),
+        )
+        if [symbol for symbol, _ in ranking] == [symbol for symbol, _ in self.ranking]:
+            self.ranking = ranking
+            return []
+
+        previous, self.published, self.ranking = self.published, ranking, ranking
+        self.version += 1
+        return [self._message(previous)]
+
+    async def _on_event(self, _: str) -> list[object]:
+        cooldown = self._cooldown()
+        if cooldown <= 0:
+            return await self.refresh()
+        if self.timer is None or self.timer.done():
+            self.timer = asyncio.create_task(self._refresh_later(cooldown))
+        return []
+
+    async def _refresh_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            self.deliver(await self.refresh())
+        except RedisError:
+            LOGGER.exception("Failed to refresh trending snapshot")
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[Subscription]:
+        if self._cooldown() <= 0:
+            try:
+                self.deliver(await self.refresh())
+            except RedisError:
+                LOGGER.exception("Failed to refresh trending snapshot")
+        async with super().connect() as subscription:
+            subscription.put(TRENDING_KEY, self.snapshot(), time.monotonic())
+            yield subscription
+
+    def deliver(self, payloads: list[object], received_at: float | None = None) -> None:
+        received_at = time.monotonic() if received_at is None else received_at
+        for subscription in list(self.connections):
+            for payload in payloads:
+                subscription.put(TRENDING_KEY, self.snapshot() if subscription.pending else payload, received_at)
+
+    async def close(self) -> None:
+        timer, self.timer = self.timer, None
+        if timer is not None:
+            timer.cancel()
+        await super().close()
@@ -1,37 +1,77 @@
+import asyncio
 import csv
 import os
+import time
 
 from redis.asyncio import Redis
 
-from store import ensure_index, save_stock
+from store import ensure_index, save_stocks
 
 # Symbol,Name,Last Sale,Net Change,% Change,Market Cap,Country,IPO Year,Volume,Sector,Industry
 
+CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', '500'))
+CONCURRENCY = int(os.getenv('LOAD_CONCURRENCY', '4'))
+
+
+def to_stock(row):
+    return {
+        'pk': row['Symbol'],
+        'symbol': row['Symbol'],
+        'name': row['Name'],
+        'last_sale': row['Last Sale'],
+        'market_cap': row['Market Cap'],
+        'country': row['Country'],
+        'ipo': row['IPO Year'],
+        'volume': row['Volume'],
+        'sector': row['Sector'],
+        'industry': row['Industry'],
+        'news': [],
+    }
+
+
+def read_chunks(path, size):
+    with open(path, newline='') as csvfile:
+        chunk = []
+        for row in csv.DictReader(csvfile):
+            chunk.append(to_stock(row))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
 async def main():
     db = Redis.from_url(
         os.getenv("REDIS_URL", "redis://localhost:6379"),
         decode_responses=True,
     )
     await ensure_index(db)
-    with open('nasdaq.csv', newline='') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            await save_stock(db, {
-                'pk': row['Symbol'],
-                'symbol': row['Symbol'],
-                'name': row['Name'],
-                'last_sale': row['Last Sale'],
-                'market_cap': row['Market Cap'],
-                'country': row['Country'],
-                'ipo': row['IPO Year'],
-                'volume': row['Volume'],
-                'sector': row['Sector'],
-                'industry': row['Industry'],
-                'news': [],
-            })
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(CONCURRENCY, 1))
+    tasks = []
+    rows = 0
+
+    async def load(chunk):
+        try:
+            return await save_stocks(db, chunk)
+        finally:
+            semaphore.release()
+
+    for chunk in read_chunks('nasdaq.csv', max(CHUNK_SIZE, 1)):
+        await semaphore.acquire()
+        rows += len(chunk)
+        tasks.append(asyncio.create_task(load(chunk)))
+
+    written = sum(await asyncio.gather(*tasks))
+    elapsed = time.perf_counter() - started
+    print(
+        f'Loaded {rows} rows ({written} written, {rows - written} unchanged) '
+        f'in {elapsed:.2f}s ({rows / elapsed:.0f} rows/sec)'
+    )
 
     await db.aclose()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
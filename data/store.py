@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+import json
+
 from redis.asyncio import Redis
 from redis.commands.json.path import Path
 from redis.commands.search.field import TextField
@@ -8,12 +11,17 @@ from redis.exceptions import ResponseError
 
 INDEX_NAME = "stocks:index"
 STOCK_KEY_PREFIX = "stocks:"
+HASHES_KEY = "stock-hashes"
 
 
 def make_stock_key(symbol: str) -> str:
     return f"{STOCK_KEY_PREFIX}{symbol.upper()}"
 
 
+def make_news_ids_key(symbol: str) -> str:
+    return f"{make_stock_key(symbol)}:news:ids"
+
+
 async def ensure_index(db: Redis) -> None:
     try:
         await db.ft(INDEX_NAME).create_index(
@@ -33,5 +41,37 @@ async def ensure_index(db: Redis) -> None:
             raise
 
 
-async def save_stock(db: Redis, stock: dict) -> None:
-    await db.json().set(make_stock_key(stock["symbol"]), Path.root_path(), stock)
+def stock_hash(stock: dict) -> str:
+    return hashlib.sha1(json.dumps(stock, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def save_stocks(db: Redis, stocks: list[dict]) -> int:
+    if not stocks:
+        return 0
+
+    symbols = [stock["symbol"] for stock in stocks]
+    pipe = db.pipeline(transaction=False)
+    pipe.hmget(HASHES_KEY, symbols)
+    for symbol in symbols:
+        pipe.exists(make_stock_key(symbol))
+    stored_hashes, *existing = await pipe.execute()
+
+    changed = {}
+    for stock, stored_hash, found in zip(stocks, stored_hashes, existing):
+        digest = stock_hash(stock)
+        if not found or stored_hash != digest:
+            changed[stock["symbol"]] = (stock, digest, found)
+    if not changed:
+        return 0
+
+    pipe = db.pipeline(transaction=False)
+    for symbol, (stock, _, found) in changed.items():
+        if found:
+            reference = {field: value for field, value in stock.items() if field != "news"}
+            pipe.json().merge(make_stock_key(symbol), Path.root_path(), reference)
+        else:
+            pipe.json().set(make_stock_key(symbol), Path.root_path(), stock)
+            pipe.unlink(make_news_ids_key(symbol))
+    pipe.hset(HASHES_KEY, mapping={symbol: digest for symbol, (_, digest, _) in changed.items()})
+    await pipe.execute()
+    return len(changed)
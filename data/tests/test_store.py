@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from store import HASHES_KEY, make_news_ids_key, make_stock_key, save_stocks
+
+
+def _stock(symbol: str, name: str) -> dict:
+    return {
+        "pk": symbol,
+        "symbol": symbol,
+        "name": name,
+        "last_sale": "$1.00",
+        "market_cap": "1",
+        "country": "United States",
+        "ipo": "2000",
+        "volume": "10",
+        "sector": "Technology",
+        "industry": "Software",
+        "news": [],
+    }
+
+
+async def _clear(db: Redis) -> None:
+    await db.delete(make_stock_key("TESTD"), make_news_ids_key("TESTD"), HASHES_KEY)
+
+
+async def test_reloading_a_changed_row_keeps_appended_news():
+    db = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    await _clear(db)
+    key = make_stock_key("TESTD")
+
+    assert await save_stocks(db, [_stock("TESTD", "Test Data Inc.")]) == 1
+    await db.json().arrappend(key, "$.news", {"id": "testd-1", "headline": "Appended"})
+    await db.zadd(make_news_ids_key("TESTD"), {"testd-1": 1})
+
+    assert await save_stocks(db, [_stock("TESTD", "Test Data Inc.")]) == 0
+    assert await save_stocks(db, [_stock("TESTD", "Test Data Corp.")]) == 1
+
+    stock = await db.json().get(key)
+    assert stock["name"] == "Test Data Corp."
+    assert [item["id"] for item in stock["news"]] == ["testd-1"]
+    assert await db.exists(make_news_ids_key("TESTD"))
+
+    await db.delete(key)
+    assert await save_stocks(db, [_stock("TESTD", "Test Data Corp.")]) == 1
+    assert (await db.json().get(key))["news"] == []
+    assert not await db.exists(make_news_ids_key("TESTD"))
+
+    await _clear(db)
+    await db.aclose()
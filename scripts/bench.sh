@@ -0,0 +1,20 @@
+#!/usr/bin/env zsh
+set -euo pipefail
+
+python3.13 -m venv .venv
+source .venv/bin/activate
+pip install -q -r requirements-dev.txt -r api/requirements.txt -r stream/requirements.txt -r data/requirements.txt
+
+docker compose up -d redis
+
+mkdir -p bench-results
+output="$PWD/bench-results/$(git rev-parse --short HEAD).jsonl"
+: > "$output"
+
+(cd stream && python benchmarks/ingest.py) >> "$output"
+(cd stream && python benchmarks/loop_lag.py) >> "$output"
+(cd api && python benchmarks/store_latency.py) >> "$output"
+(cd api && python benchmarks/routes_latency.py) >> "$output"
+(cd api && python benchmarks/close_latency.py) >> "$output"
+
+echo "Wrote $output"
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("ticks_per_sec", "p50_ms", "p99_ms", "loop_lag_p99_ms")
+
+
+def _load(path: Path) -> dict[str, dict]:
+    results = {}
+    for line in path.read_text().splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        key = f"{result['suite']} {result['name']} {json.dumps(result['params'], sort_keys=True)}"
+        results[key] = result
+    return results
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files written by scripts/bench.sh.")
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    args = parser.parse_args()
+
+    before, after = _load(args.before), _load(args.after)
+    for key in sorted(before.keys() & after.keys()):
+        for metric in METRICS:
+            if metric in before[key] and metric in after[key]:
+                print(
+                    f"{key} {metric}: {before[key][metric]} -> {after[key][metric]} "
+                    f"({_change(before[key][metric], after[key][metric])})"
+                )
+    for key in sorted(before.keys() ^ after.keys()):
+        print(f"{key}: only in {args.before if key in before else args.after}")
+
+
+if __name__ == "__main__":
+    main()
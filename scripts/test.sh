@@ -9,4 +9,5 @@ docker compose up -d redis
 
 (cd api && pytest tests)
 (cd stream && pytest tests)
+(cd data && pytest tests)
 (cd ui && npm install && npm run test)
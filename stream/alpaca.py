@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import functools
 import logging
 import os
+import time
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 
 import dateutil.parser as dp
 from alpaca_trade_api.common import URL
@@ -12,13 +15,25 @@ from alpaca_trade_api.rest import REST, TimeFrame, TimeFrameUnit
 from alpaca_trade_api.stream import Stream
 from dateutil.relativedelta import relativedelta
 
-from connection import db, db_sync
-from store import add_news, get_watchlist, record_bar, record_trade
+from connection import db
+from notifier import Notifier
+from sharding import ShardCoordinator
+from store import TickBatcher, add_news, get_watchlist, record_history_async
+from tape import TapeRecorder
+from trending import trending_loop
 
 LOGGER = logging.getLogger(__name__)
 
 ALPACA_API_KEY = os.getenv("APCA_API_KEY_ID")
 ALPACA_SECRET_KEY = os.getenv("APCA_API_SECRET_KEY")
+TAPE_RECORD_PATH = os.getenv("TAPE_RECORD_PATH")
+BOOTSTRAP_CONCURRENCY = max(int(os.getenv("BOOTSTRAP_CONCURRENCY", "4")), 1)
+
+SymbolHistory = tuple[
+    list[tuple[int, float, int]],
+    list[tuple[int, float, float, float, float, int]],
+    list[dict],
+]
 
 api = REST()
 stream = Stream(
@@ -28,6 +43,12 @@ stream = Stream(
     data_feed="iex",
 )
 watch_list: set[str] = set()
+shard: ShardCoordinator | None = None
+notifier = Notifier(db)
+batcher = TickBatcher(db, notifier=notifier)
+recorder = TapeRecorder(TAPE_RECORD_PATH) if TAPE_RECORD_PATH else None
+bootstrap_pool = ThreadPoolExecutor(max_workers=BOOTSTRAP_CONCURRENCY, thread_name_prefix="bootstrap")
+bootstrap_tasks: dict[str, asyncio.Task] = {}
 
 
 def _news_symbol(payload: object) -> str | None:
@@ -39,130 +60,139 @@ def _news_symbol(payload: object) -> str | None:
     return None
 
 
-async def _seed_news(symbol: str) -> None:
-    now = datetime.datetime.now(datetime.timezone.utc)
-    values = api.get_news(
-        symbol,
-        (now - relativedelta(days=8)).isoformat(),
-        (now - relativedelta(minutes=16)).isoformat(),
-        limit=10,
-    )
-    news_items = []
-    for item in values:
-        raw = item._raw
-        news_items.append(
-            {
-                "id": str(raw.get("id", "")),
-                "headline": raw.get("headline", ""),
-                "author": raw.get("author", ""),
-                "created_at": raw.get("created_at", ""),
-                "updated_at": raw.get("updated_at", ""),
-                "summary": raw.get("summary", ""),
-                "url": raw.get("url", ""),
-                "images": raw.get("images", []),
-                "symbols": raw.get("symbols", [symbol]),
-                "source": raw.get("source", "alpaca"),
-            }
-        )
-    if news_items:
-        await add_news(db, symbol, news_items)
+def _news_item(raw: dict, symbol: str) -> dict:
+    return {
+        "id": str(raw.get("id", "")),
+        "headline": raw.get("headline", ""),
+        "author": raw.get("author", ""),
+        "created_at": raw.get("created_at", ""),
+        "updated_at": raw.get("updated_at", ""),
+        "summary": raw.get("summary", ""),
+        "url": raw.get("url", ""),
+        "images": raw.get("images", []),
+        "symbols": raw.get("symbols", [symbol]),
+        "source": raw.get("source", "alpaca"),
+    }
 
 
-async def bootstrap_symbol(symbol: str) -> None:
+def _history_window() -> tuple[str, str, str]:
     now = datetime.datetime.now(datetime.timezone.utc)
-    trade_values = api.get_trades(
-        symbol,
+    return (
         (now - relativedelta(minutes=76)).isoformat(),
         (now - relativedelta(minutes=16)).isoformat(),
-        limit=50,
+        (now - relativedelta(days=8)).isoformat(),
     )
-    bar_values = api.get_bars(
+
+
+def _timestamp_ms(value: str) -> int:
+    return int(dp.parse(value).timestamp() * 1000)
+
+
+def fetch_history(symbol: str) -> SymbolHistory:
+    start, end, news_start = _history_window()
+    trade_values = api.get_trades(symbol, start, end, limit=50)
+    bar_values = api.get_bars(symbol, TimeFrame(1, TimeFrameUnit.Minute), start, end, limit=200)
+    news_values = api.get_news(symbol, news_start, end, limit=10)
+
+    trades = [
+        (_timestamp_ms(raw["t"]), float(raw["p"]), int(raw["s"]))
+        for raw in (value._raw for value in trade_values)
+    ]
+    bars = [
+        (_timestamp_ms(raw["t"]), float(raw["o"]), float(raw["h"]), float(raw["l"]), float(raw["c"]), int(raw["v"]))
+        for raw in (value._raw for value in bar_values)
+    ]
+    return trades, bars, [_news_item(value._raw, symbol) for value in news_values]
+
+
+async def bootstrap_symbol(symbol: str) -> None:
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    trades, bars, news = await loop.run_in_executor(bootstrap_pool, fetch_history, symbol)
+    if shard is not None and not shard.owns(symbol):
+        LOGGER.info("Skipping bootstrap of %s, it is no longer owned by this worker", symbol)
+        return
+
+    samples = await record_history_async(db, symbol, trades, bars)
+    if news:
+        await add_news(db, symbol, news)
+    if trades:
+        notifier.mark("trade", [symbol])
+    if bars:
+        notifier.mark("bar", [symbol])
+    LOGGER.info(
+        "Bootstrapped %s with %d samples and %d news items in %.2f s",
         symbol,
-        TimeFrame(1, TimeFrameUnit.Minute),
-        (now - relativedelta(minutes=76)).isoformat(),
-        (now - relativedelta(minutes=16)).isoformat(),
-        limit=200,
+        samples,
+        len(news),
+        time.perf_counter() - started,
     )
 
-    for trade in trade_values:
-        raw = trade._raw
-        record_trade(
-            db_sync,
-            symbol,
-            int(dp.parse(raw["t"]).timestamp() * 1000),
-            float(raw["p"]),
-            int(raw["s"]),
-        )
-
-    for bar in bar_values:
-        raw = bar._raw
-        record_bar(
-            db_sync,
-            symbol,
-            int(dp.parse(raw["t"]).timestamp() * 1000),
-            float(raw["o"]),
-            float(raw["h"]),
-            float(raw["l"]),
-            float(raw["c"]),
-            int(raw["v"]),
-        )
-
-    await _seed_news(symbol)
+
+async def _bootstrap(symbol: str) -> None:
+    try:
+        await bootstrap_symbol(symbol)
+    except asyncio.CancelledError:
+        LOGGER.info("Cancelled bootstrap of %s", symbol)
+        raise
+    except Exception:
+        LOGGER.exception("Failed to bootstrap %s", symbol)
+
+
+def _bootstrap_done(symbol: str, task: asyncio.Task) -> None:
+    if bootstrap_tasks.get(symbol) is task:
+        del bootstrap_tasks[symbol]
+
+
+def start_bootstrap(symbols: Iterable[str]) -> None:
+    for symbol in symbols:
+        if symbol in bootstrap_tasks:
+            continue
+        task = asyncio.create_task(_bootstrap(symbol))
+        bootstrap_tasks[symbol] = task
+        task.add_done_callback(functools.partial(_bootstrap_done, symbol))
+
+
+def cancel_bootstrap(symbols: Iterable[str]) -> None:
+    for symbol in symbols:
+        task = bootstrap_tasks.pop(symbol, None)
+        if task is not None:
+            task.cancel()
 
 
 async def update_trade(trade: object) -> None:
     symbol = str(getattr(trade, "symbol")).upper()
     timestamp = int(getattr(trade, "timestamp").timestamp() * 1000)
-    record_trade(
-        db_sync,
-        symbol,
-        timestamp,
-        float(getattr(trade, "price")),
-        int(getattr(trade, "size")),
-    )
-    await db.publish("trade", symbol)
-    await db.publish("trending-stocks", "updated")
+    price = float(getattr(trade, "price"))
+    size = int(getattr(trade, "size"))
+    if recorder is not None:
+        recorder.record_trade(symbol, timestamp, price, size)
+    await batcher.add_trade(symbol, timestamp, price, size)
 
 
 async def update_bar(bar: object) -> None:
     symbol = str(getattr(bar, "symbol")).upper()
-    timestamp_ns = int(getattr(bar, "timestamp"))
-    record_bar(
-        db_sync,
-        symbol,
-        timestamp_ns // 1_000_000,
+    values = (
+        int(getattr(bar, "timestamp")) // 1_000_000,
         float(getattr(bar, "open")),
         float(getattr(bar, "high")),
         float(getattr(bar, "low")),
         float(getattr(bar, "close")),
         int(getattr(bar, "volume")),
     )
-    await db.publish("bar", symbol)
+    if recorder is not None:
+        recorder.record_bar(symbol, *values)
+    await batcher.add_bar(symbol, *values)
 
 
 async def update_news(news: object) -> None:
     symbol = _news_symbol(news)
     if not symbol:
         return
-    raw = getattr(news, "_raw", {})
-    await add_news(
-        db,
-        symbol,
-        [
-            {
-                "id": str(raw.get("id", "")),
-                "headline": raw.get("headline", ""),
-                "author": raw.get("author", ""),
-                "created_at": raw.get("created_at", ""),
-                "updated_at": raw.get("updated_at", ""),
-                "summary": raw.get("summary", ""),
-                "url": raw.get("url", ""),
-                "images": raw.get("images", []),
-                "symbols": raw.get("symbols", [symbol]),
-                "source": raw.get("source", "alpaca"),
-            }
-        ],
-    )
+    item = _news_item(getattr(news, "_raw", {}), symbol)
+    if recorder is not None:
+        recorder.record_news(symbol, item)
+    await add_news(db, symbol, [item])
 
 
 async def subscribe(symbols: Iterable[str]) -> None:
@@ -171,12 +201,12 @@ async def subscribe(symbols: Iterable[str]) -> None:
         return
 
     LOGGER.info("Subscribing to %s", normalized)
-    for symbol in normalized:
-        await bootstrap_symbol(symbol)
     stream.subscribe_trades(update_trade, *normalized)
     stream.subscribe_bars(update_bar, *normalized)
     stream.subscribe_news(update_news, *normalized)
 
+    start_bootstrap(normalized)
+
 
 async def unsubscribe(symbols: Iterable[str]) -> None:
     normalized = [symbol.upper() for symbol in symbols]
@@ -184,14 +214,14 @@ async def unsubscribe(symbols: Iterable[str]) -> None:
         return
 
     LOGGER.info("Unsubscribing from %s", normalized)
+    cancel_bootstrap(normalized)
     stream.unsubscribe_trades(*normalized)
     stream.unsubscribe_bars(*normalized)
     stream.unsubscribe_news(*normalized)
 
 
-async def sync_watchlist() -> None:
+async def apply_watchlist(new_watch_list: set[str]) -> None:
     global watch_list
-    new_watch_list = set(await get_watchlist(db))
     removed = sorted(watch_list - new_watch_list)
     added = sorted(new_watch_list - watch_list)
 
@@ -203,6 +233,24 @@ async def sync_watchlist() -> None:
     watch_list = new_watch_list
 
 
+async def release_symbols(symbols: list[str]) -> None:
+    await apply_watchlist(watch_list.difference(symbols))
+    await batcher.flush()
+
+
+async def apply_shard() -> None:
+    if shard is not None:
+        await apply_watchlist(set(shard.assigned))
+
+
+async def sync_watchlist() -> None:
+    if shard is None:
+        await apply_watchlist(set(await get_watchlist(db)))
+        return
+    await shard.rebalance()
+    await apply_shard()
+
+
 async def listen_for_watchlist_updates() -> None:
     pubsub = db.pubsub()
     await pubsub.subscribe("watchlist-updated")
@@ -213,10 +261,29 @@ async def listen_for_watchlist_updates() -> None:
         await sync_watchlist()
 
 
-async def run_live() -> None:
+async def run_live(coordinator: ShardCoordinator | None = None) -> None:
+    global shard
     if not ALPACA_API_KEY or not ALPACA_SECRET_KEY:
         raise RuntimeError("Live mode requires Alpaca credentials")
 
+    shard = coordinator
+    if shard is not None:
+        shard.on_release = release_symbols
+        batcher.owns = shard.owns
     await sync_watchlist()
+    if shard is not None:
+        asyncio.create_task(shard.run(apply_shard))
+    asyncio.create_task(batcher.run())
+    asyncio.create_task(notifier.run())
+    asyncio.create_task(trending_loop(db, notifier))
     asyncio.create_task(listen_for_watchlist_updates())
-    await stream._run_forever()
+    if recorder is not None:
+        LOGGER.info("Recording market tape to %s", recorder.path)
+        asyncio.create_task(recorder.run())
+    try:
+        await stream._run_forever()
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if shard is not None:
+            await shard.stop()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
+from alpaca_trade_api.rest import REST, TimeFrame
+from redis.asyncio import Redis as AsyncRedis
+
+from store import DAY_MS, PRICE_SERIES_FIELDS, SERIES_RETENTION_MS, make_series_key, write_samples_async
+
+LOGGER = logging.getLogger(__name__)
+
+BACKFILL_CONCURRENCY = max(int(os.getenv("BACKFILL_CONCURRENCY", "4")), 1)
+BACKFILL_SYMBOLS_PER_REQUEST = max(int(os.getenv("BACKFILL_SYMBOLS_PER_REQUEST", "100")), 1)
+BACKFILL_WINDOW_MS = DAY_MS
+CHECKPOINT_KEY_PREFIX = "backfill"
+BAR_FIELDS = PRICE_SERIES_FIELDS["bars"]
+RAW_BAR_FIELDS = ("o", "h", "l", "c", "v")
+
+BarColumns = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def make_checkpoint_key(start_ms: int, end_ms: int) -> str:
+    return f"{CHECKPOINT_KEY_PREFIX}:{start_ms}:{end_ms}"
+
+
+def windows(start_ms: int, end_ms: int, window_ms: int = BACKFILL_WINDOW_MS) -> list[tuple[int, int]]:
+    return [(start, min(start + window_ms, end_ms)) for start in range(start_ms, end_ms, window_ms)]
+
+
+def _isoformat(timestamp_ms: int) -> str:
+    return datetime.datetime.fromtimestamp(timestamp_ms / 1000, datetime.timezone.utc).isoformat()
+
+
+def bar_columns(raw_bars: list[dict]) -> BarColumns:
+    symbols = np.array([bar["S"] for bar in raw_bars], dtype=str)
+    timestamps = np.strings.rstrip(np.array([bar["t"] for bar in raw_bars], dtype=str), "Z")
+    values = np.array([[bar[field] for field in RAW_BAR_FIELDS] for bar in raw_bars], dtype=np.float64)
+    return symbols, timestamps.astype("datetime64[ms]").astype(np.int64), values.reshape(-1, len(BAR_FIELDS))
+
+
+def bar_samples(symbols: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> list[tuple[str, int, float]]:
+    order = np.lexsort((timestamps, symbols))
+    symbols, timestamps, values = symbols[order], timestamps[order], values[order]
+    names, starts = np.unique(symbols, return_index=True)
+    bounds = [*starts.tolist(), len(symbols)]
+
+    samples: list[tuple[str, int, float]] = []
+    for symbol, start, end in zip(names.tolist(), bounds, bounds[1:]):
+        stamps = timestamps[start:end].tolist()
+        for column, field in enumerate(BAR_FIELDS):
+            key = make_series_key(symbol, "bars", field)
+            samples.extend(zip(repeat(key), stamps, values[start:end, column].tolist()))
+    return samples
+
+
+def fetch_bars(api: REST, symbols: list[str], start_ms: int, end_ms: int) -> BarColumns:
+    raw_bars = list(
+        api.get_bars_iter(symbols, TimeFrame.Minute, _isoformat(start_ms), _isoformat(end_ms - 1), raw=True)
+    )
+    return bar_columns(raw_bars)
+
+
+class Backfill:
+    def __init__(
+        self,
+        db: AsyncRedis,
+        api: REST,
+        start_ms: int,
+        end_ms: int,
+        concurrency: int = BACKFILL_CONCURRENCY,
+        symbols_per_request: int = BACKFILL_SYMBOLS_PER_REQUEST,
+        checkpoint_key: str | None = None,
+    ) -> None:
+        self.db = db
+        self.api = api
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.concurrency = max(concurrency, 1)
+        self.symbols_per_request = max(symbols_per_request, 1)
+        self.checkpoint_key = checkpoint_key or make_checkpoint_key(start_ms, end_ms)
+        self.pool: ThreadPoolExecutor | None = None
+        self.bars = 0
+        self.samples = 0
+        self.windows = 0
+
+    async def pending(self, symbols: list[str]) -> dict[str, int]:
+        checkpoints = await self.db.hmget(self.checkpoint_key, symbols) if symbols else []
+        resume = {symbol: int(done or self.start_ms) for symbol, done in zip(symbols, checkpoints)}
+        return {symbol: done for symbol, done in resume.items() if done < self.end_ms}
+
+    async def _load_window(self, symbols: list[str], start_ms: int, end_ms: int) -> None:
+        loop = asyncio.get_running_loop()
+        columns = await loop.run_in_executor(self.pool, fetch_bars, self.api, symbols, start_ms, end_ms)
+        samples = await loop.run_in_executor(self.pool, bar_samples, *columns)
+        await write_samples_async(self.db, samples)
+        await self.db.hset(self.checkpoint_key, mapping=dict.fromkeys(symbols, end_ms))
+        self.bars += len(columns[0])
+        self.samples += len(samples)
+        self.windows += 1
+        LOGGER.info("Backfilled %d bars for %d symbols up to %s", len(columns[0]), len(symbols), _isoformat(end_ms))
+
+    async def _load_group(self, resume: dict[str, int]) -> None:
+        for start_ms, end_ms in windows(self.start_ms, self.end_ms):
+            symbols = [symbol for symbol, done in resume.items() if done < end_ms]
+            if symbols:
+                await self._load_window(symbols, start_ms, end_ms)
+
+    async def run(self, symbols: Iterable[str]) -> dict[str, int | float]:
+        started = time.perf_counter()
+        self.bars = self.samples = self.windows = 0
+        resume = await self.pending(sorted({symbol.upper() for symbol in symbols}))
+        names = list(resume)
+        size = self.symbols_per_request
+        groups = [names[start : start + size] for start in range(0, len(names), size)]
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as self.pool:
+            await asyncio.gather(*(self._load_group({symbol: resume[symbol] for symbol in group}) for group in groups))
+
+        elapsed = time.perf_counter() - started
+        return {
+            "symbols": len(names),
+            "windows": self.windows,
+            "bars": self.bars,
+            "samples": self.samples,
+            "seconds": round(elapsed, 3),
+            "bars_per_sec": round(self.bars / elapsed, 1) if elapsed else 0,
+        }
+
+
+def _parse_day(value: str) -> int:
+    day = datetime.date.fromisoformat(value)
+    return int(datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+
+
+def _read_symbols(args: argparse.Namespace) -> list[str]:
+    symbols = [symbol.strip() for symbol in (args.symbols or "").split(",") if symbol.strip()]
+    if args.symbols_file:
+        symbols.extend(line.strip() for line in args.symbols_file.read_text().splitlines() if line.strip())
+    return symbols
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill minute bars from Alpaca into RedisTimeSeries.")
+    parser.add_argument("--symbols", help="Comma separated symbols")
+    parser.add_argument("--symbols-file", type=Path, help="File with one symbol per line")
+    parser.add_argument(
+        "--start",
+        required=True,
+        help="First day (YYYY-MM-DD, UTC). Must be within the raw bar retention (BARS_RETENTION_MS), because "
+        "older samples are rejected by the raw series and never reach the 5m/1h/1d tiers.",
+    )
+    parser.add_argument("--end", required=True, help="Last day, inclusive (YYYY-MM-DD, UTC)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint for this range")
+    args = parser.parse_args()
+
+    symbols = _read_symbols(args)
+    if not symbols:
+        parser.error("Pass --symbols or --symbols-file")
+
+    start_ms, end_ms = _parse_day(args.start), _parse_day(args.end) + DAY_MS
+    if start_ms >= end_ms:
+        parser.error("--end must not be before --start")
+    retention_ms = SERIES_RETENTION_MS["bars"]
+    if retention_ms:
+        oldest_ms = (int(time.time() * 1000) - retention_ms) // DAY_MS * DAY_MS + DAY_MS
+        if start_ms < oldest_ms:
+            parser.error(
+                f"Raw bars keep {retention_ms // DAY_MS} days, so the earliest --start is {_isoformat(oldest_ms)[:10]}"
+            )
+
+    db = AsyncRedis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+    backfill = Backfill(db, REST(), start_ms, end_ms)
+    try:
+        if args.restart:
+            await db.delete(backfill.checkpoint_key)
+        print(json.dumps(await backfill.run(symbols)))
+    finally:
+        await db.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s %(levelname)s %(message)s",
+        level=logging.INFO,
+    )
+    asyncio.run(main())
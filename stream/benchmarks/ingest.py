@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loop_lag import bench_symbols, clear, ingest_batched
+from store import ensure_price_series, record_bar, record_bar_async, record_trade, record_trade_async
+from timing import emit, summarize
+
+DEFAULT_BATCH_SIZES = [50, 500, 5000]
+
+Writer = Callable[[str, int], Awaitable[None]]
+
+
+async def _time_writes(symbols: list[str], ticks: int, write: Writer) -> tuple[float, list[float]]:
+    timings: list[float] = []
+    started = time.perf_counter()
+    for tick in range(ticks):
+        for symbol in symbols:
+            call_started = time.perf_counter()
+            await write(symbol, 1000 + tick)
+            timings.append((time.perf_counter() - call_started) * 1000)
+    return time.perf_counter() - started, timings
+
+
+def _writers(db: AsyncRedis, db_sync: Redis) -> dict[str, Writer]:
+    async def trade_sync(symbol: str, timestamp: int) -> None:
+        record_trade(db_sync, symbol, timestamp, 100.0, 100)
+
+    async def bar_sync(symbol: str, timestamp: int) -> None:
+        record_bar(db_sync, symbol, timestamp, 100.0, 101.0, 99.0, 100.5, 1000)
+
+    async def trade_async(symbol: str, timestamp: int) -> None:
+        await record_trade_async(db, symbol, timestamp, 100.0, 100)
+
+    async def bar_async(symbol: str, timestamp: int) -> None:
+        await record_bar_async(db, symbol, timestamp, 100.0, 101.0, 99.0, 100.5, 1000)
+
+    return {
+        "record_trade": trade_sync,
+        "record_bar": bar_sync,
+        "record_trade_async": trade_async,
+        "record_bar_async": bar_async,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure tick ingestion throughput of the stream store.")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    args = parser.parse_args()
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    db = AsyncRedis.from_url(redis_url, decode_responses=True)
+    db_sync = Redis.from_url(redis_url, decode_responses=True)
+    symbols = bench_symbols(args.symbols)
+    params = {"symbols": args.symbols, "ticks": args.ticks}
+
+    for name, write in _writers(db, db_sync).items():
+        clear(db_sync)
+        for symbol in symbols:
+            ensure_price_series(db_sync, symbol)
+        elapsed, timings = await _time_writes(symbols, args.ticks, write)
+        emit(
+            "stream.ingest",
+            name,
+            params,
+            ticks=len(timings),
+            seconds=round(elapsed, 4),
+            ticks_per_sec=round(len(timings) / elapsed, 1),
+            **summarize(timings),
+        )
+
+    for batch_size in args.batch_sizes:
+        clear(db_sync)
+        started = time.perf_counter()
+        await ingest_batched(db, db_sync, symbols, args.ticks, max_ticks=batch_size)
+        elapsed = time.perf_counter() - started
+        total_ticks = args.ticks * len(symbols) * 2
+        emit(
+            "stream.ingest",
+            "tick_batcher",
+            {**params, "batch_size": batch_size},
+            ticks=total_ticks,
+            seconds=round(elapsed, 4),
+            ticks_per_sec=round(total_ticks / elapsed, 1),
+        )
+
+    clear(db_sync)
+    db_sync.close()
+    await db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
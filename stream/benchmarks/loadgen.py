@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from notifier import Notifier
+from replay import ReplayFeed
+from store import TickBatcher, all_series_keys, forget_price_series
+from timing import emit, summarize
+
+NASDAQ_CSV_PATH = Path(__file__).resolve().parents[2] / "data" / "nasdaq.csv"
+PATH_BLOCK_SIZE = 256
+SLICE_SECONDS = 0.01
+TICKS_PER_EMIT = 2
+
+
+def load_base_prices(path: Path, count: int) -> dict[str, float]:
+    prices: dict[str, float] = {}
+    with path.open("r", encoding="utf-8") as csv_file:
+        for row in csv.DictReader(csv_file):
+            symbol = row["Symbol"].strip().upper()
+            try:
+                price = float(row["Last Sale"].strip().lstrip("$"))
+            except ValueError:
+                continue
+            if symbol.isalnum() and price > 0:
+                prices[symbol] = price
+            if len(prices) == count:
+                break
+    return prices
+
+
+class SyntheticFeed(ReplayFeed):
+    def __init__(
+        self,
+        base_prices: dict[str, float],
+        batcher: TickBatcher | None = None,
+        seed: int = 0,
+        volatility: float = 0.001,
+        block_size: int = PATH_BLOCK_SIZE,
+    ) -> None:
+        self.fixture = {"symbols": {symbol: {"basePrice": price} for symbol, price in base_prices.items()}}
+        self.batcher = batcher
+        self.tick = 0
+        self.columns = {symbol: column for column, symbol in enumerate(base_prices)}
+        self.rng = np.random.default_rng(seed)
+        self.volatility = volatility
+        self.block_size = max(block_size, 1)
+        self.last = np.array(list(base_prices.values()), dtype=np.float64)
+        self._generate()
+
+    def _generate(self) -> None:
+        shape = (self.block_size, len(self.columns))
+        closes = self.last * np.exp(np.cumsum(self.rng.normal(0.0, self.volatility, shape), axis=0))
+        opens = np.vstack([self.last, closes[:-1]])
+        wicks = np.abs(self.rng.normal(0.0, self.volatility, (2, *shape))) * closes
+        self.last = closes[-1]
+        self.closes = closes.round(2).tolist()
+        self.opens = opens.round(2).tolist()
+        self.highs = (np.maximum(opens, closes) + wicks[0]).round(2).tolist()
+        self.lows = (np.minimum(opens, closes) - wicks[1]).round(2).tolist()
+        self.sizes = self.rng.integers(1, 1000, shape).tolist()
+        self.volumes = self.rng.integers(1000, 100_000, shape).tolist()
+
+    def quote(self, symbol: str) -> tuple[float, float, float, float, int, int]:
+        row, column = self.tick % self.block_size, self.columns[symbol]
+        return (
+            self.closes[row][column],
+            self.opens[row][column],
+            self.highs[row][column],
+            self.lows[row][column],
+            self.sizes[row][column],
+            self.volumes[row][column],
+        )
+
+    def advance(self) -> None:
+        self.tick += 1
+        if self.tick % self.block_size == 0:
+            self._generate()
+
+
+async def run_load(db: AsyncRedis, feed: SyntheticFeed, batcher: TickBatcher, rate: float, duration: float) -> dict:
+    symbols = feed.symbols()
+    lags: list[float] = []
+    emitted = cursor = 0
+    flushes = batcher.flushes
+    started = time.perf_counter()
+
+    while (elapsed := time.perf_counter() - started) < duration:
+        timestamp_ms = int(time.time() * 1000)
+        due = int(elapsed * rate / TICKS_PER_EMIT) - emitted
+        for _ in range(due):
+            await feed.emit(db, symbols[cursor], timestamp_ms)
+            cursor += 1
+            if cursor == len(symbols):
+                cursor = 0
+                feed.advance()
+        emitted += due
+
+        if batcher.flushes != flushes:
+            flushes = batcher.flushes
+            lags.append(batcher.last_lag_ms)
+        await asyncio.sleep(SLICE_SECONDS)
+
+    await batcher.flush()
+    elapsed = time.perf_counter() - started
+    ticks = emitted * TICKS_PER_EMIT
+    return {
+        "emits": emitted,
+        "ticks": ticks,
+        "seconds": round(elapsed, 3),
+        "achieved_rate": round(ticks / elapsed, 1),
+        "achieved_ratio": round(ticks / elapsed / rate, 3),
+        **batcher.stats(),
+        **{f"ingest_lag_{metric}": value for metric, value in summarize(lags).items()},
+    }
+
+
+def clear(db_sync: Redis, symbols: list[str]) -> None:
+    pipe = db_sync.pipeline(transaction=False)
+    for symbol in symbols:
+        pipe.delete(*all_series_keys(symbol))
+    pipe.execute()
+    forget_price_series()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive synthetic ticks for NASDAQ symbols through the ingest path.")
+    parser.add_argument("--symbols", type=int, default=500, help="Number of symbols taken from nasdaq.csv")
+    parser.add_argument(
+        "--rate", type=float, default=5000, help="Target ticks per second; each emit is one trade and one bar"
+    )
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", type=Path, default=NASDAQ_CSV_PATH)
+    parser.add_argument("--keep", action="store_true", help="Keep the generated series instead of deleting them")
+    args = parser.parse_args()
+
+    base_prices = load_base_prices(args.csv, args.symbols)
+    if not base_prices:
+        parser.error(f"No symbols with a last sale price in {args.csv}")
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    db = AsyncRedis.from_url(redis_url, decode_responses=True)
+    db_sync = Redis.from_url(redis_url, decode_responses=True)
+    symbols = list(base_prices)
+
+    notifier = Notifier(db)
+    batcher = TickBatcher(db, notifier=notifier)
+    feed = SyntheticFeed(base_prices, batcher=batcher, seed=args.seed)
+    tasks = [asyncio.create_task(batcher.run()), asyncio.create_task(notifier.run())]
+
+    try:
+        result = await run_load(db, feed, batcher, args.rate, args.duration)
+        emit(
+            "stream.loadgen",
+            "synthetic",
+            {"symbols": len(symbols), "target_rate": args.rate, "duration": args.duration, "seed": args.seed},
+            **result,
+        )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not args.keep:
+            clear(db_sync, symbols)
+        db_sync.close()
+        await db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
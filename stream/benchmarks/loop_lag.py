@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from store import TickBatcher, forget_price_series, record_bar, record_bar_async, record_trade, record_trade_async
+from timing import emit, summarize
+
+PROBE_INTERVAL_SECONDS = 0.001
+
+
+def bench_symbols(count: int) -> list[str]:
+    return [f"BENCH{index}" for index in range(count)]
+
+
+def clear(db_sync: Redis) -> None:
+    keys = list(db_sync.scan_iter(match="stocks:BENCH*"))
+    if keys:
+        db_sync.delete(*keys)
+    forget_price_series()
+
+
+async def _probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL_SECONDS) * 1000)
+
+
+async def ingest_sync(db: AsyncRedis, db_sync: Redis, symbols: list[str], ticks: int) -> None:
+    for tick in range(ticks):
+        for symbol in symbols:
+            record_trade(db_sync, symbol, 1000 + tick, 100.0 + tick, 100)
+            record_bar(db_sync, symbol, 1000 + tick, 100.0, 101.0, 99.0, 100.5, 1000)
+        await asyncio.sleep(0)
+
+
+async def ingest_async(db: AsyncRedis, db_sync: Redis, symbols: list[str], ticks: int) -> None:
+    async def one(symbol: str, tick: int) -> None:
+        await record_trade_async(db, symbol, 1000 + tick, 100.0 + tick, 100)
+        await record_bar_async(db, symbol, 1000 + tick, 100.0, 101.0, 99.0, 100.5, 1000)
+
+    for tick in range(ticks):
+        await asyncio.gather(*(one(symbol, tick) for symbol in symbols))
+
+
+async def ingest_batched(
+    db: AsyncRedis,
+    db_sync: Redis,
+    symbols: list[str],
+    ticks: int,
+    max_ticks: int | None = None,
+) -> None:
+    batcher = TickBatcher(db) if max_ticks is None else TickBatcher(db, max_ticks=max_ticks)
+    for tick in range(ticks):
+        for symbol in symbols:
+            await batcher.add_trade(symbol, 1000 + tick, 100.0 + tick, 100)
+            await batcher.add_bar(symbol, 1000 + tick, 100.0, 101.0, 99.0, 100.5, 1000)
+        await asyncio.sleep(0)
+    await batcher.flush()
+
+
+MODES: dict[str, Callable[[AsyncRedis, Redis, list[str], int], Awaitable[None]]] = {
+    "sync": ingest_sync,
+    "async": ingest_async,
+    "batched": ingest_batched,
+}
+
+
+async def run_mode(mode: str, db: AsyncRedis, db_sync: Redis, symbols: list[str], ticks: int) -> dict:
+    clear(db_sync)
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+
+    started = time.perf_counter()
+    await MODES[mode](db, db_sync, symbols, ticks)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    clear(db_sync)
+
+    total_ticks = ticks * len(symbols) * 2
+    return {
+        "ticks": total_ticks,
+        "seconds": round(elapsed, 4),
+        "ticks_per_sec": round(total_ticks / elapsed, 1),
+        **{f"loop_lag_{metric}": value for metric, value in summarize(lags).items()},
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure event-loop lag while ingesting ticks.")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    db = AsyncRedis.from_url(redis_url, decode_responses=True)
+    db_sync = Redis.from_url(redis_url, decode_responses=True)
+    symbols = bench_symbols(args.symbols)
+
+    for mode in args.modes:
+        result = await run_mode(mode, db, db_sync, symbols, args.ticks)
+        emit("stream.loop_lag", mode, {"symbols": args.symbols, "ticks": args.ticks}, **result)
+
+    db_sync.close()
+    await db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import json
+import statistics
+
+
+def summarize(timings_ms: list[float]) -> dict[str, float]:
+    if not timings_ms:
+        return {"p50_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    if len(timings_ms) == 1:
+        percentiles = timings_ms * 99
+    else:
+        percentiles = statistics.quantiles(timings_ms, n=100, method="inclusive")
+    return {
+        "p50_ms": round(percentiles[49], 4),
+        "p99_ms": round(percentiles[98], 4),
+        "mean_ms": round(statistics.fmean(timings_ms), 4),
+        "max_ms": round(max(timings_ms), 4),
+    }
+
+
+def emit(suite: str, name: str, params: dict, **metrics: object) -> None:
+    print(json.dumps({"suite": suite, "name": name, "params": params, **metrics}), flush=True)
@@ -4,8 +4,12 @@ from redis import Redis
 from redis.asyncio import Redis as AsyncRedis
 from dotenv import load_dotenv
 
+from metrics import METRICS_ENABLED, CountingConnection
+from profiling import REDIS_PROFILE, ProfiledAsyncRedis, ProfiledRedis
+
 load_dotenv()
 
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-db = AsyncRedis.from_url(redis_url, decode_responses=True)
-db_sync = Redis.from_url(redis_url, decode_responses=True)
+options = {"connection_class": CountingConnection} if METRICS_ENABLED and redis_url.startswith("redis://") else {}
+db = (ProfiledAsyncRedis if REDIS_PROFILE else AsyncRedis).from_url(redis_url, decode_responses=True, **options)
+db_sync = (ProfiledRedis if REDIS_PROFILE else Redis).from_url(redis_url, decode_responses=True)
@@ -2,36 +2,41 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import multiprocessing
 import os
+import signal
 import time
 
 from alpaca import run_live
-from connection import db, db_sync
+from connection import db
+from metrics import METRICS_ENABLED, METRICS_PORT, start_metrics_server
+from notifier import Notifier
 from replay import ReplayFeed
-from store import get_watchlist, reset_trending
+from sharding import ShardCoordinator
+from store import TickBatcher, get_watchlist
+from tape import TapeReader
+from trending import ensure_trending_async, trending_loop
 
 LOGGER = logging.getLogger(__name__)
 
-
-async def reset_trending_loop(interval_seconds: int = 60) -> None:
-    while True:
-        reset_trending(db_sync)
-        await asyncio.sleep(interval_seconds)
+STREAM_WORKERS = max(int(os.getenv("STREAM_WORKERS", "1")), 1)
+STREAM_SHARDING = os.getenv("STREAM_SHARDING", str(STREAM_WORKERS > 1)).lower() == "true"
 
 
-async def replay_loop() -> None:
-    feed = ReplayFeed(os.getenv("REPLAY_FIXTURE_PATH"))
+async def replay_loop(batcher: TickBatcher, coordinator: ShardCoordinator | None = None) -> None:
+    feed = ReplayFeed(os.getenv("REPLAY_FIXTURE_PATH"), batcher=batcher)
     speed = max(float(os.getenv("REPLAY_SPEED", "1")), 0.1)
     loop = os.getenv("REPLAY_LOOP", "true").lower() != "false"
 
     while True:
-        watchlist = await get_watchlist(db)
+        watchlist = sorted(coordinator.assigned) if coordinator is not None else await get_watchlist(db)
         timestamp_ms = int(time.time() * 1000)
 
         for symbol in watchlist:
             if symbol in feed.symbols():
-                await feed.emit(db, db_sync, symbol, timestamp_ms)
+                await feed.emit(db, symbol, timestamp_ms)
 
+        await batcher.flush()
         feed.advance()
         await asyncio.sleep(1 / speed)
 
@@ -39,30 +44,112 @@ async def replay_loop() -> None:
             break
 
 
-async def run_replay() -> None:
-    asyncio.create_task(reset_trending_loop())
-    await replay_loop()
+async def run_replay(coordinator: ShardCoordinator | None = None) -> None:
+    notifier = Notifier(db)
+    batcher = TickBatcher(db, notifier=notifier, owns=coordinator.owns if coordinator is not None else None)
+
+    async def flush_released(_: list[str]) -> None:
+        await batcher.flush()
+
+    if coordinator is not None:
+        coordinator.on_release = flush_released
+        await coordinator.rebalance()
+        asyncio.create_task(coordinator.run())
+    asyncio.create_task(notifier.run())
+    asyncio.create_task(trending_loop(db, notifier))
+    try:
+        await replay_loop(batcher, coordinator)
+    finally:
+        if coordinator is not None:
+            await coordinator.stop()
+
+
+async def run_tape() -> None:
+    notifier = Notifier(db)
+    batcher = TickBatcher(db, notifier=notifier)
+    reader = TapeReader(os.environ["TAPE_PATH"])
+    speed = float(os.getenv("TAPE_SPEED", "1"))
+    loop = os.getenv("TAPE_LOOP", "false").lower() == "true"
+    asyncio.create_task(notifier.run())
+    asyncio.create_task(batcher.run())
+    asyncio.create_task(trending_loop(db, notifier))
+
+    while True:
+        stats = await reader.replay(db, batcher, speed)
+        LOGGER.info("Replayed %s: %s", reader.path, stats)
+        if not loop:
+            break
 
 
-async def main() -> None:
+async def main(worker_index: int = 0) -> None:
     mode = os.getenv("MARKET_DATA_MODE", "replay").lower()
-    reset_trending(db_sync)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    if METRICS_ENABLED:
+        start_metrics_server(METRICS_PORT + worker_index)
+    await ensure_trending_async(db)
+    coordinator = ShardCoordinator(db) if STREAM_SHARDING else None
 
     if mode == "live":
-        await run_live()
+        await run_live(coordinator)
+        return
+
+    if mode == "tape":
+        LOGGER.info("Starting tape mode")
+        await run_tape()
         return
 
     LOGGER.info("Starting replay mode")
-    await run_replay()
+    await run_replay(coordinator)
 
 
-if __name__ == "__main__":
+def configure_logging() -> None:
     logging.basicConfig(
         format="%(asctime)s %(levelname)s %(message)s",
         level=logging.INFO,
     )
 
+
+def run_worker(worker_index: int) -> None:
+    configure_logging()
     try:
-        asyncio.run(main())
+        asyncio.run(main(worker_index))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        LOGGER.info("Shutting down stream worker %d", worker_index)
+
+
+def run_workers(count: int) -> None:
+    if os.getenv("MARKET_DATA_MODE", "replay").lower() == "tape":
+        raise RuntimeError("Tape mode replays a single recording and cannot run with STREAM_WORKERS > 1")
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    context = multiprocessing.get_context("spawn")
+    workers: dict[int, multiprocessing.process.BaseProcess] = {}
+    try:
+        while True:
+            for index in range(count):
+                worker = workers.get(index)
+                if worker is not None and worker.is_alive():
+                    continue
+                if worker is not None:
+                    LOGGER.warning("Stream worker %d exited with %s, restarting", index, worker.exitcode)
+                workers[index] = context.Process(target=run_worker, args=(index,), name=f"stream-worker-{index}")
+                workers[index].start()
+            time.sleep(1)
     except KeyboardInterrupt:
         LOGGER.info("Shutting down stream service")
+    finally:
+        for worker in workers.values():
+            worker.terminate()
+        for worker in workers.values():
+            worker.join()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    if STREAM_WORKERS > 1:
+        run_workers(STREAM_WORKERS)
+    else:
+        try:
+            asyncio.run(main())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            LOGGER.info("Shutting down stream service")
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+
+from redis import Redis
+
+from connection import db_sync
+from store import STOCK_KEY_PREFIX, make_news_ids_key, make_stock_key
+
+REPORT_BATCH_SIZE = 500
+
+
+def _series_key_parts(key: str) -> tuple[str, str]:
+    _, symbol, family, _, *tier = key.split(":")
+    return symbol, ":".join([family, *tier])
+
+
+def _empty_usage() -> dict[str, int]:
+    return {"keys": 0, "samples": 0, "chunks": 0, "memory_bytes": 0}
+
+
+def _add_usage(totals: dict[str, int], memory: int, samples: int = 0, chunks: int = 0) -> None:
+    totals["keys"] += 1
+    totals["samples"] += samples
+    totals["chunks"] += chunks
+    totals["memory_bytes"] += memory
+
+
+def _finish(totals: dict[str, int]) -> dict[str, int | float]:
+    samples = totals["samples"]
+    return {**totals, "bytes_per_sample": round(totals["memory_bytes"] / samples, 2) if samples else 0}
+
+
+def build_report(db: Redis, symbols: list[str] | None = None) -> dict:
+    if symbols:
+        patterns = [f"{make_stock_key(symbol)}:*" for symbol in symbols]
+    else:
+        patterns = [f"{STOCK_KEY_PREFIX}*:*"]
+    series_keys = sorted(
+        {key for pattern in patterns for key in db.scan_iter(match=pattern, count=1000, _type="TSDB-TYPE")}
+    )
+
+    families: defaultdict[str, dict[str, int]] = defaultdict(_empty_usage)
+    by_symbol: defaultdict[str, dict[str, int]] = defaultdict(_empty_usage)
+
+    for offset in range(0, len(series_keys), REPORT_BATCH_SIZE):
+        batch = series_keys[offset : offset + REPORT_BATCH_SIZE]
+        pipe = db.pipeline(transaction=False)
+        for key in batch:
+            pipe.ts().info(key)
+        for key, info in zip(batch, pipe.execute()):
+            symbol, family = _series_key_parts(key)
+            for totals in (families[family], by_symbol[symbol]):
+                _add_usage(totals, info.memory_usage or 0, info.total_samples or 0, info.chunk_count or 0)
+
+    report_symbols = sorted(symbols or by_symbol)
+    pipe = db.pipeline(transaction=False)
+    for symbol in report_symbols:
+        pipe.memory_usage(make_stock_key(symbol))
+        pipe.memory_usage(make_news_ids_key(symbol))
+    usages = pipe.execute()
+    for index, symbol in enumerate(report_symbols):
+        for family, memory in (("document", usages[index * 2]), ("news:ids", usages[index * 2 + 1])):
+            if memory:
+                _add_usage(families[family], memory)
+                _add_usage(by_symbol[symbol], memory)
+
+    total = _empty_usage()
+    for usage in families.values():
+        for field, value in usage.items():
+            total[field] += value
+
+    return {
+        "symbols": len(by_symbol),
+        "total": _finish(total),
+        "families": {family: _finish(usage) for family, usage in sorted(families.items())},
+        "per_symbol": {symbol: _finish(usage) for symbol, usage in sorted(by_symbol.items())},
+        "avg_bytes_per_symbol": round(total["memory_bytes"] / len(by_symbol), 2) if by_symbol else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report Redis memory used by stock series per symbol and family.")
+    parser.add_argument("symbols", nargs="*", help="Limit the report to these symbols")
+    parser.add_argument("--summary", action="store_true", help="Omit the per-symbol breakdown")
+    args = parser.parse_args()
+
+    report = build_report(db_sync, [symbol.upper() for symbol in args.symbols] or None)
+    if args.summary:
+        report.pop("per_symbol")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
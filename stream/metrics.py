@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import TYPE_CHECKING
+
+from prometheus_client import Counter, Histogram, start_http_server
+from redis.asyncio.connection import Connection
+
+if TYPE_CHECKING:
+    from profiling import RedisProfile
+
+LOGGER = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() != "false"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PER_TICK_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+TICKS_INGESTED = Counter("stream_ticks_ingested", "Trades and bars written to Redis")
+INGEST_LAG = Histogram(
+    "stream_ingest_lag_seconds",
+    "Age of the oldest tick in a batch when its flush completes",
+    buckets=LATENCY_BUCKETS,
+)
+FLUSH_DURATION = Histogram("stream_flush_duration_seconds", "Time spent writing one batch", buckets=LATENCY_BUCKETS)
+REDIS_ROUND_TRIPS = Counter("stream_redis_round_trips", "Commands or pipelines sent to Redis")
+NOTIFICATIONS = Counter("stream_notifications_published", "Coalesced pub/sub messages published")
+REDIS_COMMANDS = Counter("stream_redis_commands", "Redis commands sent while flushing ticks", ("command",))
+REDIS_COMMANDS_PER_TICK = Histogram(
+    "stream_redis_commands_per_tick",
+    "Redis commands per tick in each flush",
+    buckets=PER_TICK_BUCKETS,
+)
+REDIS_TIME_PER_FLUSH = Histogram(
+    "stream_redis_seconds_per_flush",
+    "Cumulative time spent waiting on Redis per flush",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class CountingConnection(Connection):
+    async def send_packed_command(self, command, check_health: bool = True) -> None:
+        REDIS_ROUND_TRIPS.inc()
+        await super().send_packed_command(command, check_health)
+
+
+def observe_flush(ticks: int, lag_seconds: float, duration_seconds: float) -> None:
+    TICKS_INGESTED.inc(ticks)
+    INGEST_LAG.observe(lag_seconds)
+    FLUSH_DURATION.observe(duration_seconds)
+
+
+def observe_redis_profile(profile: RedisProfile, ticks: int) -> None:
+    for command, count in profile.commands.items():
+        REDIS_COMMANDS.labels(command).inc(count)
+    REDIS_COMMANDS_PER_TICK.observe(profile.command_count / ticks)
+    REDIS_TIME_PER_FLUSH.observe(profile.seconds)
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> None:
+    start_http_server(port)
+    LOGGER.info("Serving metrics on port %d", port)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from collections.abc import Iterable
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from metrics import METRICS_ENABLED, NOTIFICATIONS
+from trending import TRENDING_KEY, TRENDING_SIZE
+
+LOGGER = logging.getLogger(__name__)
+
+NOTIFY_WINDOW_MS = int(os.getenv("NOTIFY_WINDOW_MS", "250"))
+
+
+class Notifier:
+    def __init__(self, db: AsyncRedis, window_ms: int = NOTIFY_WINDOW_MS) -> None:
+        self.db = db
+        self.window_ms = max(window_ms, 1)
+        self.pending: defaultdict[str, set[str]] = defaultdict(set)
+        self.trending_dirty = False
+        self.trending_ranking: tuple[str, ...] | None = None
+        self.published = 0
+
+    def mark(self, channel: str, symbols: Iterable[str]) -> None:
+        self.pending[channel].update(symbols)
+
+    def mark_trending(self) -> None:
+        self.trending_dirty = True
+
+    async def flush(self) -> int:
+        pending, self.pending = self.pending, defaultdict(set)
+        check_trending, self.trending_dirty = self.trending_dirty, False
+        if not pending and not check_trending:
+            return 0
+
+        pipe = self.db.pipeline(transaction=False)
+        channels = [channel for channel, symbols in pending.items() if symbols]
+        for channel in channels:
+            pipe.publish(channel, json.dumps(sorted(pending[channel])))
+        if check_trending:
+            pipe.zrevrange(TRENDING_KEY, 0, TRENDING_SIZE - 1)
+        results = await pipe.execute(raise_on_error=False)
+        published = len(channels)
+
+        if check_trending:
+            ranking = results[-1]
+            ranking = () if isinstance(ranking, RedisError) else tuple(ranking)
+            if ranking != self.trending_ranking:
+                self.trending_ranking = ranking
+                await self.db.publish(TRENDING_KEY, "updated")
+                published += 1
+
+        self.published += published
+        if METRICS_ENABLED:
+            NOTIFICATIONS.inc(published)
+        return published
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.window_ms / 1000)
+            try:
+                await self.flush()
+            except Exception:
+                LOGGER.exception("Notification flush failed")
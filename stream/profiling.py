@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import Pipeline as AsyncPipeline
+from redis.client import Pipeline
+
+REDIS_PROFILE = os.getenv("REDIS_PROFILE", "false").lower() == "true"
+
+
+class RedisProfile:
+    def __init__(self) -> None:
+        self.commands: Counter[str] = Counter()
+        self.calls = 0
+        self.seconds = 0.0
+
+    @property
+    def command_count(self) -> int:
+        return sum(self.commands.values())
+
+    def record(self, names: Iterable[object], seconds: float) -> None:
+        self.commands.update(str(name).upper() for name in names)
+        self.calls += 1
+        self.seconds += seconds
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={count}" for name, count in self.commands.most_common())
+
+
+current_profile: ContextVar[RedisProfile | None] = ContextVar("redis_profile", default=None)
+
+
+@contextmanager
+def profile_redis() -> Iterator[RedisProfile]:
+    profile = RedisProfile()
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+def _record(names: Iterable[object], started: float) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(names, time.perf_counter() - started)
+
+
+class ProfiledPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True) -> list:
+        names = [args[0] for args, _ in self.command_stack]
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            _record(names, started)
+
+
+class ProfiledRedis(Redis):
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            _record(args[:1], started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> ProfiledPipeline:
+        return ProfiledPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class ProfiledAsyncPipeline(AsyncPipeline):
+    async def execute(self, raise_on_error: bool = True) -> list:
+        names = [args[0] for args, _ in self.command_stack]
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            _record(names, started)
+
+
+class ProfiledAsyncRedis(AsyncRedis):
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            _record(args[:1], started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> ProfiledAsyncPipeline:
+        return ProfiledAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
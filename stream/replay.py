@@ -4,16 +4,17 @@ import json
 import math
 from pathlib import Path
 
-from store import add_news, record_bar, record_trade
+from store import TickBatcher, add_news, record_bar_async, record_trade_async
 
 DEFAULT_FIXTURE_PATH = Path(__file__).with_name("fixtures").joinpath("replay.json")
 
 
 class ReplayFeed:
-    def __init__(self, fixture_path: str | None = None) -> None:
+    def __init__(self, fixture_path: str | None = None, batcher: TickBatcher | None = None) -> None:
         path = Path(fixture_path) if fixture_path else DEFAULT_FIXTURE_PATH
         with path.open("r", encoding="utf-8") as fixture:
             self.fixture = json.load(fixture)
+        self.batcher = batcher
         self.tick = 0
 
     def symbols(self) -> list[str]:
@@ -25,24 +26,33 @@ class ReplayFeed:
         if news:
             await add_news(db, symbol, news)
 
-    async def emit(self, db, db_sync, symbol: str, timestamp_ms: int) -> None:
-        symbol_data = self.fixture["symbols"][symbol]
-        base_price = float(symbol_data["basePrice"])
+    def quote(self, symbol: str) -> tuple[float, float, float, float, int, int]:
+        base_price = float(self.fixture["symbols"][symbol]["basePrice"])
         cycle = self.tick % 16
         delta = math.sin(cycle / 2) * 1.6
         price = round(base_price + delta, 2)
-        open_price = round(price - 0.4, 2)
-        high = round(price + 0.6, 2)
-        low = round(price - 0.7, 2)
-        size = 100 + cycle * 10
-        volume = 1000 + cycle * 25
-
-        record_trade(db_sync, symbol, timestamp_ms, price, size)
-        record_bar(db_sync, symbol, timestamp_ms, open_price, high, low, price, volume)
-
-        await db.publish("trade", symbol)
-        await db.publish("bar", symbol)
-        await db.publish("trending-stocks", "updated")
+        return (
+            price,
+            round(price - 0.4, 2),
+            round(price + 0.6, 2),
+            round(price - 0.7, 2),
+            100 + cycle * 10,
+            1000 + cycle * 25,
+        )
+
+    async def emit(self, db, symbol: str, timestamp_ms: int) -> None:
+        price, open_price, high, low, size, volume = self.quote(symbol)
+
+        if self.batcher is not None:
+            await self.batcher.add_trade(symbol, timestamp_ms, price, size)
+            await self.batcher.add_bar(symbol, timestamp_ms, open_price, high, low, price, volume)
+        else:
+            await record_trade_async(db, symbol, timestamp_ms, price, size)
+            await record_bar_async(db, symbol, timestamp_ms, open_price, high, low, price, volume)
+
+            await db.publish("trade", symbol)
+            await db.publish("bar", symbol)
+            await db.publish("trending-stocks", "updated")
         await self.ensure_news(db, symbol)
 
     def advance(self) -> None:
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from store import get_watchlist
+
+LOGGER = logging.getLogger(__name__)
+
+SHARD_WORKERS_KEY = "stream-workers"
+SHARD_LEASE_PREFIX = "stream-lease:"
+SHARD_LEASE_MS = int(os.getenv("SHARD_LEASE_MS", "10000"))
+SHARD_REBALANCE_MS = int(os.getenv("SHARD_REBALANCE_MS", "2000"))
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "64"))
+
+CLAIM_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def make_lease_key(symbol: str) -> str:
+    return f"{SHARD_LEASE_PREFIX}{symbol}"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, workers: Iterable[str], vnodes: int = SHARD_VNODES) -> None:
+        points = sorted((_hash(f"{worker}#{index}"), worker) for worker in workers for index in range(max(vnodes, 1)))
+        self.hashes = [point for point, _ in points]
+        self.workers = [worker for _, worker in points]
+
+    def owner(self, symbol: str) -> str | None:
+        if not self.workers:
+            return None
+        return self.workers[bisect.bisect(self.hashes, _hash(symbol)) % len(self.workers)]
+
+
+class ShardCoordinator:
+    def __init__(
+        self,
+        db: AsyncRedis,
+        worker_id: str | None = None,
+        lease_ms: int = SHARD_LEASE_MS,
+        vnodes: int = SHARD_VNODES,
+        on_release: Callable[[list[str]], Awaitable[None]] | None = None,
+    ) -> None:
+        self.db = db
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_ms = max(lease_ms, 1)
+        self.vnodes = vnodes
+        self.on_release = on_release
+        self.claim = db.register_script(CLAIM_SCRIPT)
+        self.release = db.register_script(RELEASE_SCRIPT)
+        self.lock = asyncio.Lock()
+        self.workers: list[str] = []
+        self.assigned: set[str] = set()
+        self.lease_deadline = 0.0
+
+    def owns(self, symbol: str) -> bool:
+        return symbol in self.assigned and time.monotonic() < self.lease_deadline
+
+    async def heartbeat(self) -> list[str]:
+        now_ms = int(time.time() * 1000)
+        pipe = self.db.pipeline(transaction=True)
+        pipe.zadd(SHARD_WORKERS_KEY, {self.worker_id: now_ms + self.lease_ms})
+        pipe.zremrangebyscore(SHARD_WORKERS_KEY, "-inf", now_ms)
+        pipe.zrange(SHARD_WORKERS_KEY, 0, -1)
+        *_, workers = await pipe.execute()
+        if workers != self.workers:
+            LOGGER.info("Stream workers changed: %s", workers)
+        self.workers = workers
+        return workers
+
+    async def rebalance(self, watchlist: Iterable[str] | None = None) -> tuple[list[str], list[str]]:
+        async with self.lock:
+            return await self._rebalance(watchlist)
+
+    async def _rebalance(self, watchlist: Iterable[str] | None) -> tuple[list[str], list[str]]:
+        symbols = await get_watchlist(self.db) if watchlist is None else watchlist
+        started = time.monotonic()
+        ring = HashRing(await self.heartbeat(), self.vnodes)
+        desired = sorted(symbol for symbol in symbols if ring.owner(symbol) == self.worker_id)
+        released = sorted(self.assigned.difference(desired))
+        previous = set(self.assigned)
+
+        if released and self.on_release is not None:
+            await self.on_release(released)
+        self.assigned.difference_update(released)
+
+        pipe = self.db.pipeline(transaction=False)
+        for symbol in released:
+            await self.release(keys=[make_lease_key(symbol)], args=[self.worker_id], client=pipe)
+        for symbol in desired:
+            await self.claim(keys=[make_lease_key(symbol)], args=[self.worker_id, self.lease_ms], client=pipe)
+        results = await pipe.execute()
+
+        claimed = {symbol for symbol, held in zip(desired, results[len(released) :]) if held}
+        added, removed = sorted(claimed - previous), sorted(previous - claimed)
+        self.assigned = claimed
+        self.lease_deadline = started + self.lease_ms / 1000
+        if added or removed:
+            LOGGER.info("Worker %s now owns %d symbols (+%s -%s)", self.worker_id, len(claimed), added, removed)
+        return added, removed
+
+    async def run(self, on_change: Callable[[], Awaitable[None]] | None = None) -> None:
+        while True:
+            try:
+                added, removed = await self.rebalance()
+                if (added or removed) and on_change is not None:
+                    await on_change()
+            except RedisError:
+                LOGGER.exception("Shard rebalance failed")
+            await asyncio.sleep(SHARD_REBALANCE_MS / 1000)
+
+    async def stop(self) -> None:
+        async with self.lock:
+            released = sorted(self.assigned)
+            if released and self.on_release is not None:
+                await self.on_release(released)
+            self.assigned = set()
+
+            pipe = self.db.pipeline(transaction=False)
+            for symbol in released:
+                await self.release(keys=[make_lease_key(symbol)], args=[self.worker_id], client=pipe)
+            pipe.zrem(SHARD_WORKERS_KEY, self.worker_id)
+            await pipe.execute()
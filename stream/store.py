@@ -1,11 +1,74 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
 from redis import Redis
 from redis.asyncio import Redis as AsyncRedis
-from redis.commands.json.path import Path
 from redis.exceptions import ResponseError
 
+from metrics import METRICS_ENABLED, observe_flush, observe_redis_profile
+from profiling import REDIS_PROFILE, profile_redis
+from trending import (
+    bucket_index,
+    queue_trending,
+    reset_trending,
+    reset_trending_async,
+    roll_trending,
+    trade_weight,
+    trending_failed,
+)
+
+if TYPE_CHECKING:
+    from notifier import Notifier
+
+LOGGER = logging.getLogger(__name__)
+
 STOCK_KEY_PREFIX = "stocks:"
+PRICE_SERIES_FIELDS = {
+    "trades": ("price", "size"),
+    "bars": ("open", "high", "low", "close", "volume"),
+}
+BAR_AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+}
+COMPACTION_TIERS = {
+    "5m": 5 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+}
+DAY_MS = 24 * 60 * 60 * 1000
+SERIES_RETENTION_MS = {
+    "trades": int(os.getenv("TRADES_RETENTION_MS", str(DAY_MS))),
+    "bars": int(os.getenv("BARS_RETENTION_MS", str(7 * DAY_MS))),
+    "bars:5m": int(os.getenv("BARS_5M_RETENTION_MS", str(60 * DAY_MS))),
+    "bars:1h": int(os.getenv("BARS_1H_RETENTION_MS", str(2 * 365 * DAY_MS))),
+    "bars:1d": int(os.getenv("BARS_1D_RETENTION_MS", "0")),
+}
+SERIES_CHUNK_SIZE = {
+    "trades": int(os.getenv("TRADES_CHUNK_SIZE", "4096")),
+    "bars": int(os.getenv("BARS_CHUNK_SIZE", "4096")),
+    "bars:5m": int(os.getenv("BARS_5M_CHUNK_SIZE", "1024")),
+    "bars:1h": int(os.getenv("BARS_1H_CHUNK_SIZE", "1024")),
+    "bars:1d": int(os.getenv("BARS_1D_CHUNK_SIZE", "1024")),
+}
+NEWS_LIMIT = int(os.getenv("NEWS_LIMIT", "50"))
+NEWS_IDS_LIMIT = int(os.getenv("NEWS_IDS_LIMIT", "1000"))
+TICK_BATCH_SIZE = int(os.getenv("TICK_BATCH_SIZE", "500"))
+TICK_FLUSH_MS = int(os.getenv("TICK_FLUSH_MS", "50"))
+MADD_CHUNK_SIZE = int(os.getenv("MADD_CHUNK_SIZE", "5000"))
+MISSING_SERIES_ERROR = "key does not exist"
+
+_created_series: set[str] = set()
 
 
 def make_stock_key(symbol: str) -> str:
@@ -16,66 +79,256 @@ async def get_watchlist(db: AsyncRedis) -> list[str]:
     return sorted(await db.smembers("watchlist"))
 
 
-async def add_news(db: AsyncRedis, symbol: str, items: list[dict]) -> None:
+def make_news_ids_key(symbol: str) -> str:
+    return f"{make_stock_key(symbol)}:news:ids"
+
+
+async def add_news(db: AsyncRedis, symbol: str, items: list[dict], limit: int = NEWS_LIMIT) -> int | None:
+    if not items:
+        return 0
+
     key = make_stock_key(symbol)
-    document = await db.json().get(key)
-    if not document:
-        return
+    ids_key = make_news_ids_key(symbol)
+    now_us = time.time_ns() // 1000
+    pipe = db.pipeline(transaction=False)
+    pipe.exists(ids_key)
+    pipe.json().arrlen(key, "$.news")
+    for offset, item in enumerate(items):
+        pipe.zadd(ids_key, {item["id"]: now_us + offset}, nx=True)
+    seeded, lengths, *added = await pipe.execute(raise_on_error=False)
 
-    existing_news = document.get("news", [])
-    seen_ids = {item["id"] for item in existing_news if "id" in item}
-    for item in items:
-        if item["id"] not in seen_ids:
-            existing_news.append(item)
-            seen_ids.add(item["id"])
+    if lengths is None or isinstance(lengths, ResponseError):
+        await db.delete(ids_key)
+        return None
 
-    document["news"] = existing_news
-    await db.json().set(key, Path.root_path(), document)
+    length = lengths[0] if lengths and lengths[0] is not None else 0
+    existing_ids: list[str] = []
+    if not seeded and length:
+        existing_ids = await db.json().get(key, "$.news[*].id") or []
+        await db.zadd(ids_key, {news_id: offset for offset, news_id in enumerate(existing_ids)})
 
+    new_items = [item for item, is_new in zip(items, added) if is_new == 1 and item["id"] not in existing_ids]
+    if not new_items:
+        return 0
 
-def ensure_price_series(db_sync: Redis, symbol: str) -> None:
-    keys = [
-        f"stocks:{symbol}:trades:price",
-        f"stocks:{symbol}:trades:size",
-        f"stocks:{symbol}:bars:open",
-        f"stocks:{symbol}:bars:high",
-        f"stocks:{symbol}:bars:low",
-        f"stocks:{symbol}:bars:close",
-        f"stocks:{symbol}:bars:volume",
+    pipe = db.pipeline(transaction=False)
+    if lengths and lengths[0] is not None:
+        pipe.json().arrappend(key, "$.news", *new_items)
+    else:
+        pipe.json().set(key, "$.news", new_items)
+    if length + len(new_items) > limit:
+        pipe.json().arrtrim(key, "$.news", -limit, -1)
+    pipe.zremrangebyrank(ids_key, 0, -max(limit, NEWS_IDS_LIMIT) - 1)
+    await pipe.execute()
+    return len(new_items)
+
+
+def make_series_key(symbol: str, family: str, field: str) -> str:
+    return f"{STOCK_KEY_PREFIX}{symbol}:{family}:{field}"
+
+
+def make_compaction_key(symbol: str, field: str, tier: str) -> str:
+    return f"{make_series_key(symbol, 'bars', field)}:{tier}"
+
+
+def price_series_keys(symbol: str) -> list[str]:
+    return [
+        make_series_key(symbol, family, field)
+        for family, fields in PRICE_SERIES_FIELDS.items()
+        for field in fields
     ]
-    ts = db_sync.ts()
 
-    for key in keys:
-        if db_sync.exists(key):
+
+def compaction_keys(symbol: str) -> list[str]:
+    return [make_compaction_key(symbol, field, tier) for field in BAR_AGGREGATIONS for tier in COMPACTION_TIERS]
+
+
+def all_series_keys(symbol: str) -> list[str]:
+    return price_series_keys(symbol) + compaction_keys(symbol)
+
+
+def forget_price_series(symbol: str | None = None) -> None:
+    if symbol is None:
+        _created_series.clear()
+    else:
+        _created_series.discard(symbol)
+
+
+def _check_created(results: list[object]) -> None:
+    for result in results:
+        if isinstance(result, ResponseError) and "already" not in str(result):
+            raise result
+
+
+def series_family(family: str, tier: str = "raw") -> str:
+    return family if tier == "raw" else f"{family}:{tier}"
+
+
+def _series_labels(symbol: str, family: str, field: str, tier: str = "raw") -> dict[str, str]:
+    return {"symbol": symbol, "family": family, "field": field, "tier": tier}
+
+
+def _series_options(symbol: str, family: str, field: str, tier: str = "raw") -> dict:
+    series = series_family(family, tier)
+    return {
+        "retention_msecs": SERIES_RETENTION_MS[series],
+        "chunk_size": SERIES_CHUNK_SIZE[series],
+        "labels": _series_labels(symbol, family, field, tier),
+    }
+
+
+def _queue_series_setup(pipe, symbol: str, existing: list[int]) -> None:
+    found = {key for key, exists in zip(all_series_keys(symbol), existing) if exists}
+
+    for family, fields in PRICE_SERIES_FIELDS.items():
+        for field in fields:
+            key = make_series_key(symbol, family, field)
+            options = _series_options(symbol, family, field)
+            if key in found:
+                pipe.ts().alter(key, **options)
+            else:
+                pipe.ts().create(key, duplicate_policy="last", **options)
+
+    for field, aggregation in BAR_AGGREGATIONS.items():
+        for tier, bucket_ms in COMPACTION_TIERS.items():
+            key = make_compaction_key(symbol, field, tier)
+            options = _series_options(symbol, "bars", field, tier)
+            if key in found:
+                pipe.ts().alter(key, **options)
+                continue
+            pipe.ts().create(key, duplicate_policy="last", **options)
+            pipe.ts().createrule(make_series_key(symbol, "bars", field), key, aggregation, bucket_ms)
+
+
+def ensure_price_series(db_sync: Redis, symbol: str) -> None:
+    if symbol in _created_series:
+        return
+
+    pipe = db_sync.pipeline(transaction=False)
+    for key in all_series_keys(symbol):
+        pipe.exists(key)
+    existing = pipe.execute()
+
+    pipe = db_sync.pipeline(transaction=False)
+    _queue_series_setup(pipe, symbol, existing)
+    _check_created(pipe.execute(raise_on_error=False))
+
+    _created_series.add(symbol)
+
+
+async def ensure_price_series_async(db: AsyncRedis, symbol: str) -> None:
+    if symbol in _created_series:
+        return
+
+    pipe = db.pipeline(transaction=False)
+    for key in all_series_keys(symbol):
+        pipe.exists(key)
+    existing = await pipe.execute()
+
+    pipe = db.pipeline(transaction=False)
+    _queue_series_setup(pipe, symbol, existing)
+    _check_created(await pipe.execute(raise_on_error=False))
+
+    _created_series.add(symbol)
+
+
+def _sample_symbol(sample: tuple[str, str, float]) -> str:
+    return sample[0].split(":")[1]
+
+
+def _missing_samples(samples: list[tuple[str, str, float]], results: object) -> list[tuple[str, str, float]]:
+    outcomes = [results] * len(samples) if isinstance(results, ResponseError) else results
+    missing: list[tuple[str, str, float]] = []
+    rejected: list[ResponseError] = []
+    for sample, result in zip(samples, outcomes):
+        if not isinstance(result, ResponseError):
             continue
-        ts.create(key, duplicate_policy="last", labels={"symbol": symbol})
+        if MISSING_SERIES_ERROR in str(result):
+            missing.append(sample)
+        else:
+            rejected.append(result)
+    if rejected:
+        LOGGER.warning("Redis rejected %d of %d samples: %s", len(rejected), len(samples), rejected[0])
+    return missing
+
 
+def _recover_samples(db_sync: Redis, samples: list[tuple[str, str, float]], results: object) -> None:
+    missing = _missing_samples(samples, results)
+    if not missing:
+        return
 
-def reset_trending(db_sync: Redis) -> None:
-    if db_sync.exists("trending-stocks"):
-        db_sync.delete("trending-stocks")
-    db_sync.topk().reserve("trending-stocks", 12, 50, 4, 0.9)
+    for symbol in {_sample_symbol(sample) for sample in missing}:
+        forget_price_series(symbol)
+        ensure_price_series(db_sync, symbol)
+    db_sync.ts().madd(missing)
 
 
-def ensure_trending(db_sync: Redis) -> None:
-    if not db_sync.exists("trending-stocks"):
-        reset_trending(db_sync)
+async def _recover_samples_async(db: AsyncRedis, samples: list[tuple[str, str, float]], results: object) -> None:
+    missing = _missing_samples(samples, results)
+    if not missing:
+        return
+
+    for symbol in {_sample_symbol(sample) for sample in missing}:
+        forget_price_series(symbol)
+        await ensure_price_series_async(db, symbol)
+    await db.ts().madd(missing)
+
+
+def _trade_samples(symbol: str, timestamp_ms: int, price: float, size: int) -> list[tuple[str, str, float]]:
+    return [
+        (make_series_key(symbol, "trades", "price"), str(timestamp_ms), price),
+        (make_series_key(symbol, "trades", "size"), str(timestamp_ms), size),
+    ]
+
+
+def _bar_samples(
+    symbol: str,
+    timestamp_ms: int,
+    open_price: float,
+    high: float,
+    low: float,
+    close: float,
+    volume: int,
+) -> list[tuple[str, str, float]]:
+    return [
+        (make_series_key(symbol, "bars", "open"), str(timestamp_ms), open_price),
+        (make_series_key(symbol, "bars", "high"), str(timestamp_ms), high),
+        (make_series_key(symbol, "bars", "low"), str(timestamp_ms), low),
+        (make_series_key(symbol, "bars", "close"), str(timestamp_ms), close),
+        (make_series_key(symbol, "bars", "volume"), str(timestamp_ms), volume),
+    ]
 
 
 def record_trade(db_sync: Redis, symbol: str, timestamp_ms: int, price: float, size: int) -> None:
     ensure_price_series(db_sync, symbol)
-    db_sync.ts().madd(
-        [
-            (f"stocks:{symbol}:trades:price", str(timestamp_ms), price),
-            (f"stocks:{symbol}:trades:size", str(timestamp_ms), size),
-        ]
-    )
-    ensure_trending(db_sync)
-    try:
-        db_sync.topk().add("trending-stocks", symbol)
-    except ResponseError:
+    samples = _trade_samples(symbol, timestamp_ms, price, size)
+    weights = {symbol: trade_weight(price, size)}
+    pipe = db_sync.pipeline(transaction=False)
+    pipe.ts().madd(samples)
+    queue_trending(pipe, weights)
+    results = pipe.execute(raise_on_error=False)
+    _recover_samples(db_sync, samples, results[0])
+    if trending_failed(results[1:]):
         reset_trending(db_sync)
-        db_sync.topk().add("trending-stocks", symbol)
+        pipe = db_sync.pipeline(transaction=False)
+        queue_trending(pipe, weights)
+        pipe.execute()
+
+
+async def record_trade_async(db: AsyncRedis, symbol: str, timestamp_ms: int, price: float, size: int) -> None:
+    await ensure_price_series_async(db, symbol)
+    samples = _trade_samples(symbol, timestamp_ms, price, size)
+    weights = {symbol: trade_weight(price, size)}
+    pipe = db.pipeline(transaction=False)
+    pipe.ts().madd(samples)
+    queue_trending(pipe, weights)
+    results = await pipe.execute(raise_on_error=False)
+    await _recover_samples_async(db, samples, results[0])
+    if trending_failed(results[1:]):
+        await reset_trending_async(db)
+        pipe = db.pipeline(transaction=False)
+        queue_trending(pipe, weights)
+        await pipe.execute()
 
 
 def record_bar(
@@ -89,12 +342,243 @@ def record_bar(
     volume: int,
 ) -> None:
     ensure_price_series(db_sync, symbol)
-    db_sync.ts().madd(
-        [
-            (f"stocks:{symbol}:bars:open", str(timestamp_ms), open_price),
-            (f"stocks:{symbol}:bars:high", str(timestamp_ms), high),
-            (f"stocks:{symbol}:bars:low", str(timestamp_ms), low),
-            (f"stocks:{symbol}:bars:close", str(timestamp_ms), close),
-            (f"stocks:{symbol}:bars:volume", str(timestamp_ms), volume),
-        ]
-    )
+    samples = _bar_samples(symbol, timestamp_ms, open_price, high, low, close, volume)
+    _recover_samples(db_sync, samples, db_sync.ts().madd(samples))
+
+
+async def record_bar_async(
+    db: AsyncRedis,
+    symbol: str,
+    timestamp_ms: int,
+    open_price: float,
+    high: float,
+    low: float,
+    close: float,
+    volume: int,
+) -> None:
+    await ensure_price_series_async(db, symbol)
+    samples = _bar_samples(symbol, timestamp_ms, open_price, high, low, close, volume)
+    await _recover_samples_async(db, samples, await db.ts().madd(samples))
+
+
+async def write_samples_async(
+    db: AsyncRedis,
+    samples: list[tuple[str, int | str, float]],
+    chunk_size: int = MADD_CHUNK_SIZE,
+) -> int:
+    chunks = [samples[start : start + chunk_size] for start in range(0, len(samples), max(chunk_size, 1))]
+    if not chunks:
+        return 0
+
+    for symbol in {_sample_symbol(sample) for sample in samples}:
+        await ensure_price_series_async(db, symbol)
+
+    pipe = db.pipeline(transaction=False)
+    for chunk in chunks:
+        pipe.ts().madd(chunk)
+    for chunk, results in zip(chunks, await pipe.execute(raise_on_error=False)):
+        await _recover_samples_async(db, chunk, results)
+    return len(samples)
+
+
+async def record_history_async(
+    db: AsyncRedis,
+    symbol: str,
+    trades: Iterable[tuple[int, float, int]],
+    bars: Iterable[tuple[int, float, float, float, float, int]],
+) -> int:
+    samples = [sample for trade in trades for sample in _trade_samples(symbol, *trade)]
+    samples.extend(sample for bar in bars for sample in _bar_samples(symbol, *bar))
+    return await write_samples_async(db, samples)
+
+
+class TickBatcher:
+    def __init__(
+        self,
+        db: AsyncRedis,
+        max_ticks: int = TICK_BATCH_SIZE,
+        flush_interval_ms: int = TICK_FLUSH_MS,
+        notifier: Notifier | None = None,
+        owns: Callable[[str], bool] | None = None,
+    ) -> None:
+        self.db = db
+        self.notifier = notifier
+        self.owns = owns
+        self.lock = asyncio.Lock()
+        self.max_ticks = max(max_ticks, 1)
+        self.flush_interval_ms = max(flush_interval_ms, 1)
+        self.samples: list[tuple[str, str, float]] = []
+        self.trades: Counter[str] = Counter()
+        self.bar_symbols: set[str] = set()
+        self.trending_bucket = 0
+        self.pending_ticks = 0
+        self.pending_since = 0.0
+        self.flushes = 0
+        self.ticks_flushed = 0
+        self.last_flush_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.last_redis_commands = 0
+        self.last_redis_calls = 0
+        self.unowned_samples = 0
+
+    async def add_trade(self, symbol: str, timestamp_ms: int, price: float, size: int) -> None:
+        self.samples.extend(_trade_samples(symbol, timestamp_ms, price, size))
+        self.trades[symbol] += trade_weight(price, size)
+        await self._added()
+
+    async def add_bar(
+        self,
+        symbol: str,
+        timestamp_ms: int,
+        open_price: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: int,
+    ) -> None:
+        self.samples.extend(_bar_samples(symbol, timestamp_ms, open_price, high, low, close, volume))
+        self.bar_symbols.add(symbol)
+        await self._added()
+
+    async def _added(self) -> None:
+        if not self.pending_ticks:
+            self.pending_since = time.perf_counter()
+        self.pending_ticks += 1
+        if self.pending_ticks >= self.max_ticks:
+            await self.flush()
+
+    async def flush(self) -> int:
+        async with self.lock:
+            return await self._profiled_flush()
+
+    async def _profiled_flush(self) -> int:
+        if not REDIS_PROFILE:
+            return await self._flush()
+
+        with profile_redis() as profile:
+            size = await self._flush()
+        if size:
+            self.last_redis_commands = profile.command_count
+            self.last_redis_calls = profile.calls
+            if METRICS_ENABLED:
+                observe_redis_profile(profile, size)
+            LOGGER.debug(
+                "Flush of %d ticks sent %d Redis commands in %d calls (%.2f ms): %s",
+                size,
+                profile.command_count,
+                profile.calls,
+                profile.seconds * 1000,
+                profile.summary(),
+            )
+        return size
+
+    async def _flush(self) -> int:
+        if not self.pending_ticks:
+            return 0
+
+        samples, trades, bar_symbols, size = self.samples, self.trades, self.bar_symbols, self.pending_ticks
+        pending_since = self.pending_since
+        self.samples, self.trades, self.bar_symbols, self.pending_ticks = [], Counter(), set(), 0
+        started = time.perf_counter()
+        if self.owns is not None:
+            samples, trades, bar_symbols = self._owned(samples, trades, bar_symbols)
+            if not samples:
+                return 0
+
+        now_ms = int(time.time() * 1000)
+        try:
+            for symbol in {_sample_symbol(sample) for sample in samples}:
+                await ensure_price_series_async(self.db, symbol)
+
+            if trades and bucket_index(now_ms) != self.trending_bucket:
+                await roll_trending(self.db, now_ms)
+                self.trending_bucket = bucket_index(now_ms)
+
+            pipe = self.db.pipeline(transaction=False)
+            pipe.ts().madd(samples)
+            if trades:
+                queue_trending(pipe, trades, now_ms)
+            results = await pipe.execute(raise_on_error=False)
+        except Exception:
+            self._requeue(samples, trades, bar_symbols, size, pending_since)
+            raise
+
+        await _recover_samples_async(self.db, samples, results[0])
+        if trades and trending_failed(results[1:]):
+            await reset_trending_async(self.db)
+            pipe = self.db.pipeline(transaction=False)
+            queue_trending(pipe, trades)
+            await pipe.execute()
+
+        if self.notifier is not None:
+            self.notifier.mark("trade", trades)
+            self.notifier.mark("bar", bar_symbols)
+            if trades:
+                self.notifier.mark_trending()
+
+        finished = time.perf_counter()
+        elapsed_ms = (finished - started) * 1000
+        self.flushes += 1
+        self.ticks_flushed += size
+        self.last_flush_size = size
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.last_lag_ms = (finished - pending_since) * 1000
+        self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+        if METRICS_ENABLED:
+            observe_flush(size, finished - pending_since, finished - started)
+        LOGGER.debug("Flushed %d ticks (%d samples) in %.2f ms", size, len(samples), elapsed_ms)
+        return size
+
+    def _requeue(
+        self,
+        samples: list[tuple[str, str, float]],
+        trades: Counter[str],
+        bar_symbols: set[str],
+        size: int,
+        pending_since: float,
+    ) -> None:
+        self.samples[:0] = samples
+        self.trades.update(trades)
+        self.bar_symbols |= bar_symbols
+        self.pending_since = min(pending_since, self.pending_since) if self.pending_ticks else pending_since
+        self.pending_ticks += size
+
+    def _owned(
+        self,
+        samples: list[tuple[str, str, float]],
+        trades: Counter[str],
+        bar_symbols: set[str],
+    ) -> tuple[list[tuple[str, str, float]], Counter[str], set[str]]:
+        owned = {symbol for symbol in {_sample_symbol(sample) for sample in samples} if self.owns(symbol)}
+        kept = [sample for sample in samples if _sample_symbol(sample) in owned]
+        if len(kept) < len(samples):
+            self.unowned_samples += len(samples) - len(kept)
+            LOGGER.warning("Dropped %d samples for symbols this worker no longer owns", len(samples) - len(kept))
+        return kept, Counter({symbol: trades[symbol] for symbol in trades if symbol in owned}), bar_symbols & owned
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "flushes": self.flushes,
+            "ticks_flushed": self.ticks_flushed,
+            "pending_ticks": self.pending_ticks,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "last_redis_commands": self.last_redis_commands,
+            "last_redis_calls": self.last_redis_calls,
+            "unowned_samples": self.unowned_samples,
+        }
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_ms / 1000)
+            try:
+                await self.flush()
+            except Exception:
+                LOGGER.exception("Tick flush failed")
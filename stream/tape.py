@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import mmap
+import struct
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from redis.asyncio import Redis as AsyncRedis
+
+from store import TickBatcher, add_news
+
+LOGGER = logging.getLogger(__name__)
+
+TAPE_MAGIC = b"STOCKTAPE1\n"
+TAPE_BUFFER_BYTES = 1 << 20
+TAPE_FLUSH_SECONDS = 1.0
+TAPE_YIELD_EVERY = 1000
+RECORD_HEADER = struct.Struct("<BIq")
+TRADE_RECORD = struct.Struct("<qdI")
+BAR_RECORD = struct.Struct("<qddddQ")
+TRADE, BAR, NEWS = 1, 2, 3
+
+TapeRecord = tuple[int, int, str, tuple]
+
+
+class TapeRecorder:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.path.open("ab", buffering=TAPE_BUFFER_BYTES)
+        if self.file.tell() == 0:
+            self.file.write(TAPE_MAGIC)
+        self.records = 0
+
+    def _write(self, kind: int, payload: bytes) -> None:
+        self.file.write(RECORD_HEADER.pack(kind, len(payload), time.time_ns()))
+        self.file.write(payload)
+        self.records += 1
+
+    def record_trade(self, symbol: str, timestamp_ms: int, price: float, size: int) -> None:
+        self._write(TRADE, TRADE_RECORD.pack(timestamp_ms, price, size) + symbol.encode())
+
+    def record_bar(
+        self,
+        symbol: str,
+        timestamp_ms: int,
+        open_price: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: int,
+    ) -> None:
+        self._write(BAR, BAR_RECORD.pack(timestamp_ms, open_price, high, low, close, volume) + symbol.encode())
+
+    def record_news(self, symbol: str, item: dict) -> None:
+        self._write(NEWS, json.dumps({"symbol": symbol, "item": item}, separators=(",", ":")).encode())
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(TAPE_FLUSH_SECONDS)
+            self.flush()
+
+
+class TapeReader:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.resume_ms = 0
+
+    def _shift(self, timestamp_ms: int, first_ms: int, start_ms: int, scale: float) -> int:
+        shifted = start_ms + round((timestamp_ms - first_ms) / scale)
+        self.resume_ms = max(self.resume_ms, shifted + 1)
+        return shifted
+
+    def __iter__(self) -> Iterator[TapeRecord]:
+        with self.path.open("rb") as tape_file, mmap.mmap(tape_file.fileno(), 0, access=mmap.ACCESS_READ) as tape:
+            if tape[: len(TAPE_MAGIC)] != TAPE_MAGIC:
+                raise ValueError(f"{self.path} is not a market tape")
+
+            offset = len(TAPE_MAGIC)
+            while offset + RECORD_HEADER.size <= len(tape):
+                kind, length, received_ns = RECORD_HEADER.unpack_from(tape, offset)
+                start = offset + RECORD_HEADER.size
+                if start + length > len(tape):
+                    LOGGER.warning("Ignoring truncated record at byte %d of %s", offset, self.path)
+                    return
+                offset = start + length
+
+                if kind == TRADE:
+                    values = TRADE_RECORD.unpack_from(tape, start)
+                    yield kind, received_ns, tape[start + TRADE_RECORD.size : offset].decode(), values
+                elif kind == BAR:
+                    values = BAR_RECORD.unpack_from(tape, start)
+                    yield kind, received_ns, tape[start + BAR_RECORD.size : offset].decode(), values
+                elif kind == NEWS:
+                    news = json.loads(tape[start:offset])
+                    yield kind, received_ns, news["symbol"], (news["item"],)
+
+    async def replay(self, db: AsyncRedis, batcher: TickBatcher, speed: float = 1.0) -> dict[str, int | float]:
+        started = time.perf_counter()
+        start_ms = max(time.time_ns() // 1_000_000, self.resume_ms)
+        scale = speed if speed > 0 else 1.0
+        first_ns: int | None = None
+        first_ms = 0
+        records = 0
+
+        for kind, received_ns, symbol, values in self:
+            if first_ns is None:
+                first_ns = received_ns
+                first_ms = received_ns // 1_000_000
+
+            if speed > 0:
+                delay = (received_ns - first_ns) / 1e9 / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif records % TAPE_YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+            if kind == TRADE:
+                timestamp_ms, price, size = values
+                timestamp_ms = self._shift(timestamp_ms, first_ms, start_ms, scale)
+                await batcher.add_trade(symbol, timestamp_ms, price, size)
+            elif kind == BAR:
+                timestamp_ms, open_price, high, low, close, volume = values
+                timestamp_ms = self._shift(timestamp_ms, first_ms, start_ms, scale)
+                await batcher.add_bar(symbol, timestamp_ms, open_price, high, low, close, volume)
+            else:
+                await add_news(db, symbol, list(values))
+            records += 1
+
+        await batcher.flush()
+        elapsed = time.perf_counter() - started
+        return {
+            "records": records,
+            "seconds": round(elapsed, 3),
+            "records_per_sec": round(records / elapsed, 1) if elapsed else 0,
+        }
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("APCA_API_KEY_ID", "test")
+os.environ.setdefault("APCA_API_SECRET_KEY", "test")
+
+import alpaca
+
+
+async def test_unsubscribe_cancels_pending_bootstrap(monkeypatch):
+    started = asyncio.Event()
+    finished: list[str] = []
+
+    async def slow_bootstrap(symbol: str) -> None:
+        started.set()
+        await asyncio.sleep(10)
+        finished.append(symbol)
+
+    monkeypatch.setattr(alpaca, "bootstrap_symbol", slow_bootstrap)
+    monkeypatch.setattr(alpaca.stream, "unsubscribe_trades", lambda *symbols: None)
+    monkeypatch.setattr(alpaca.stream, "unsubscribe_bars", lambda *symbols: None)
+    monkeypatch.setattr(alpaca.stream, "unsubscribe_news", lambda *symbols: None)
+
+    alpaca.start_bootstrap(["TESTA"])
+    task = alpaca.bootstrap_tasks["TESTA"]
+    await started.wait()
+    await alpaca.unsubscribe(["TESTA"])
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert task.cancelled()
+    assert finished == []
+    assert alpaca.bootstrap_tasks == {}
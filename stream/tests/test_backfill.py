@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backfill import Backfill, bar_columns, bar_samples
+from store import DAY_MS, all_series_keys, forget_price_series
+
+
+BAR = {"o": 9.5, "h": 11.0, "l": 9.0, "v": 100}
+
+
+class FakeBarsApi:
+    def __init__(self) -> None:
+        self.requests: list[tuple[list[str], str, str]] = []
+
+    def get_bars_iter(self, symbols, timeframe, start, end, raw=False):
+        self.requests.append((list(symbols), start, end))
+        day = start[:10]
+        for symbol in symbols:
+            for minute, close in ((31, 10.5), (30, 10.0)):
+                yield {"S": symbol, "t": f"{day}T14:{minute}:00Z", **BAR, "c": close}
+
+
+def test_bar_columns_parse_and_group_samples_by_series():
+    symbols, timestamps, values = bar_columns(list(FakeBarsApi().get_bars_iter(["BFA"], None, "2026-10-15", "")))
+
+    assert timestamps.tolist() == [1_792_074_660_000, 1_792_074_600_000]
+    assert values[:, 3].tolist() == [10.5, 10.0]
+    samples = bar_samples(symbols, timestamps, values)
+    assert samples[:2] == [
+        ("stocks:BFA:bars:open", 1_792_074_600_000, 9.5),
+        ("stocks:BFA:bars:open", 1_792_074_660_000, 9.5),
+    ]
+    assert samples[-1] == ("stocks:BFA:bars:volume", 1_792_074_660_000, 100.0)
+
+
+async def test_backfill_resumes_from_checkpoint():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    forget_price_series()
+    start_ms = (int(time.time() * 1000) // DAY_MS - 2) * DAY_MS
+    api = FakeBarsApi()
+    backfill = Backfill(db, api, start_ms, start_ms + 2 * DAY_MS, symbols_per_request=1)
+    await db.hset(backfill.checkpoint_key, "BFA", start_ms + DAY_MS)
+
+    stats = await backfill.run(["bfa", "BFB"])
+
+    assert [symbols for symbols, _, _ in api.requests] == [["BFA"], ["BFB"], ["BFB"]]
+    assert (stats["windows"], stats["bars"], stats["samples"]) == (3, 6, 30)
+    assert await db.hgetall(backfill.checkpoint_key) == dict.fromkeys(("BFA", "BFB"), str(start_ms + 2 * DAY_MS))
+    assert len(await db.ts().range("stocks:BFB:bars:close", "-", "+")) == 4
+    assert (await backfill.run(["BFA", "BFB"]))["windows"] == 0
+
+    await db.delete(backfill.checkpoint_key, *all_series_keys("BFA"), *all_series_keys("BFB"))
+    forget_price_series()
+    await db.aclose()
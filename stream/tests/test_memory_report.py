@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+from redis import Redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from memory_report import build_report
+from store import SERIES_RETENTION_MS, ensure_price_series, forget_price_series, record_trade
+
+
+async def test_memory_report_groups_series_by_symbol_and_family():
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    keys = db_sync.keys("stocks:TESTA*")
+    if keys:
+        db_sync.delete(*keys)
+    forget_price_series()
+
+    ensure_price_series(db_sync, "TESTA")
+    record_trade(db_sync, "TESTA", 1000, 10.5, 100)
+    report = build_report(db_sync, ["TESTA"])
+
+    assert report["symbols"] == 1
+    assert report["families"]["trades"]["keys"] == 2
+    assert report["families"]["trades"]["samples"] == 2
+    assert report["families"]["bars:5m"]["keys"] == 5
+    assert report["per_symbol"]["TESTA"]["memory_bytes"] > 0
+    assert db_sync.ts().info("stocks:TESTA:trades:price").retention_msecs == SERIES_RETENTION_MS["trades"]
+
+    keys = db_sync.keys("stocks:TESTA*")
+    if keys:
+        db_sync.delete(*keys)
+    db_sync.delete("trending-stocks")
+    db_sync.close()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from store import TickBatcher, all_series_keys, forget_price_series
+
+
+def _sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+async def test_flush_reports_ingested_ticks_and_lag():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    forget_price_series()
+    ticks, flushes = _sample("stream_ticks_ingested_total"), _sample("stream_ingest_lag_seconds_count")
+    batcher = TickBatcher(db)
+
+    await batcher.add_trade("METR", 1_000, 10.0, 5)
+    await batcher.add_bar("METR", 1_000, 9.5, 10.5, 9.0, 10.0, 100)
+    await batcher.flush()
+
+    assert _sample("stream_ticks_ingested_total") - ticks == 2
+    assert _sample("stream_ingest_lag_seconds_count") - flushes == 1
+
+    await db.delete(*all_series_keys("METR"), "trending-stocks")
+    forget_price_series()
+    await db.aclose()
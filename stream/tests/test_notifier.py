@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from notifier import Notifier
+
+
+async def _messages(pubsub) -> list[tuple[str, str]]:
+    messages = []
+    while True:
+        message = await pubsub.get_message(timeout=0.2)
+        if message is None:
+            return messages
+        if message["type"] == "message":
+            messages.append((message["channel"], message["data"]))
+
+
+async def test_notifier_coalesces_symbols_per_channel():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    pubsub = db.pubsub()
+    await pubsub.subscribe("trade", "bar")
+    await _messages(pubsub)
+
+    notifier = Notifier(db)
+    notifier.mark("trade", ["MSFT", "AAPL"])
+    notifier.mark("trade", ["AAPL"])
+    notifier.mark("bar", ["AAPL"])
+
+    assert await notifier.flush() == 2
+    assert await notifier.flush() == 0
+
+    messages = dict(await _messages(pubsub))
+    assert json.loads(messages["trade"]) == ["AAPL", "MSFT"]
+    assert json.loads(messages["bar"]) == ["AAPL"]
+
+    await pubsub.aclose()
+    await db.aclose()
+
+
+async def test_notifier_publishes_trending_only_on_ranking_change():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    await db.delete("trending-stocks")
+    pubsub = db.pubsub()
+    await pubsub.subscribe("trending-stocks")
+    await _messages(pubsub)
+
+    notifier = Notifier(db)
+    await db.zincrby("trending-stocks", 1, "AAPL")
+    notifier.mark_trending()
+    assert await notifier.flush() == 1
+
+    await db.zincrby("trending-stocks", 1, "AAPL")
+    notifier.mark_trending()
+    assert await notifier.flush() == 0
+
+    await db.zincrby("trending-stocks", 1, "MSFT")
+    notifier.mark_trending()
+    assert await notifier.flush() == 1
+
+    await db.zincrby("trending-stocks", 5, "MSFT")
+    notifier.mark_trending()
+    assert await notifier.flush() == 1
+
+    assert len(await _messages(pubsub)) == 3
+
+    await pubsub.aclose()
+    await db.delete("trending-stocks")
+    await db.aclose()
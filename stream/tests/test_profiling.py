@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from profiling import ProfiledAsyncRedis, profile_redis
+from store import TickBatcher, all_series_keys, forget_price_series
+
+
+async def test_profiled_client_counts_commands_per_flush():
+    plain = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    db = ProfiledAsyncRedis(connection_pool=plain.connection_pool)
+    forget_price_series()
+    batcher = TickBatcher(db)
+    for timestamp_ms in (1_000, 2_000, 3_000):
+        await batcher.add_trade("PROF", timestamp_ms, 10.0, 5)
+
+    with profile_redis() as profile:
+        await batcher.flush()
+
+    assert profile.commands["TS.MADD"] == 1
+    assert profile.commands["ZINCRBY"] == 2
+    assert profile.calls < profile.command_count
+
+    await plain.delete(*all_series_keys("PROF"))
+    keys = [key async for key in plain.scan_iter(match="trending-stocks*")]
+    await plain.delete(*keys)
+    forget_price_series()
+    await plain.aclose()
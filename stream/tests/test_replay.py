@@ -11,7 +11,6 @@ from redis.asyncio import Redis as AsyncRedis
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from replay import ReplayFeed
-from store import reset_trending
 
 
 async def test_replay_emits_trade_bar_and_news():
@@ -42,10 +41,10 @@ async def test_replay_emits_trade_bar_and_news():
         },
     )
     await db.sadd("watchlist", "AAPL")
-    reset_trending(db_sync)
+    await db.delete("trending-stocks")
 
     feed = ReplayFeed()
-    await feed.emit(db, db_sync, "AAPL", int(time.time() * 1000))
+    await feed.emit(db, "AAPL", int(time.time() * 1000))
 
     trade = db_sync.ts().get("stocks:AAPL:trades:price")
     bar = db_sync.ts().get("stocks:AAPL:bars:close")
@@ -62,7 +61,7 @@ async def test_replay_emits_trade_bar_and_news():
     await db.aclose()
 
 
-async def test_replay_recreates_trending_key_when_missing():
+async def test_replay_replaces_legacy_trending_key():
     db = AsyncRedis.from_url(
         os.getenv("REDIS_URL", "redis://localhost:6379"),
         decode_responses=True,
@@ -90,13 +89,13 @@ async def test_replay_recreates_trending_key_when_missing():
         },
     )
     await db.sadd("watchlist", "AAPL")
-    reset_trending(db_sync)
     await db.delete("trending-stocks")
+    await db.topk().reserve("trending-stocks", 12, 50, 4, 0.9)
 
     feed = ReplayFeed()
-    await feed.emit(db, db_sync, "AAPL", int(time.time() * 1000))
+    await feed.emit(db, "AAPL", int(time.time() * 1000))
 
-    assert db_sync.topk().list("trending-stocks")
+    assert db_sync.zscore("trending-stocks", "AAPL") > 0
 
     keys = await db.keys("stocks:AAPL*")
     if keys:
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sharding import SHARD_WORKERS_KEY, HashRing, ShardCoordinator, make_lease_key
+
+SYMBOLS = [f"SHD{index:02d}" for index in range(40)]
+
+
+def test_hash_ring_moves_only_the_joining_workers_share():
+    before = HashRing(["a", "b"])
+    after = HashRing(["a", "b", "c"])
+
+    moved = [symbol for symbol in SYMBOLS if before.owner(symbol) != after.owner(symbol)]
+
+    assert moved
+    assert all(after.owner(symbol) == "c" for symbol in moved)
+
+
+async def test_workers_split_the_watchlist_and_take_over_from_a_stopped_worker():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    await db.delete(SHARD_WORKERS_KEY, *(make_lease_key(symbol) for symbol in SYMBOLS))
+    first = ShardCoordinator(db, "worker-a")
+    second = ShardCoordinator(db, "worker-b")
+
+    assert await first.rebalance(SYMBOLS) == (SYMBOLS, [])
+    await second.rebalance(SYMBOLS)
+    assert second.assigned == set()
+
+    _, released = await first.rebalance(SYMBOLS)
+    added, _ = await second.rebalance(SYMBOLS)
+
+    assert released == added
+    assert first.assigned | second.assigned == set(SYMBOLS)
+    assert not first.assigned & second.assigned
+    assert await db.get(make_lease_key(added[0])) == "worker-b"
+
+    await second.stop()
+    await first.rebalance(SYMBOLS)
+    assert first.assigned == set(SYMBOLS)
+
+    await first.stop()
+    assert await db.exists(SHARD_WORKERS_KEY, *(make_lease_key(symbol) for symbol in SYMBOLS)) == 0
+    await db.aclose()
+
+
+async def test_ingestion_stops_before_leases_are_released_and_expires_locally():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    await db.delete(SHARD_WORKERS_KEY, *(make_lease_key(symbol) for symbol in SYMBOLS))
+    held_while_releasing: list[tuple[bool, bool]] = []
+
+    async def on_release(symbols: list[str]) -> None:
+        leases = await db.mget([make_lease_key(symbol) for symbol in symbols])
+        owned = all(first.owns(symbol) for symbol in symbols)
+        held_while_releasing.append((all(lease == "worker-a" for lease in leases), owned))
+
+    first = ShardCoordinator(db, "worker-a", on_release=on_release)
+    second = ShardCoordinator(db, "worker-b")
+    await first.rebalance(SYMBOLS)
+    await second.rebalance(SYMBOLS)
+    _, released = await first.rebalance(SYMBOLS)
+
+    assert released
+    assert held_while_releasing == [(True, True)]
+    assert not any(first.owns(symbol) for symbol in released)
+
+    first.lease_deadline = 0.0
+    assert first.assigned
+    assert not any(first.owns(symbol) for symbol in first.assigned)
+
+    await second.stop()
+    await first.stop()
+    await db.aclose()
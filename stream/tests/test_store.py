@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import ResponseError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from store import TickBatcher, _missing_samples, ensure_price_series, forget_price_series, record_history_async
+
+
+def _clear(db_sync: Redis) -> None:
+    keys = db_sync.keys("stocks:TEST*")
+    if keys:
+        db_sync.delete(*keys)
+    db_sync.delete("trending-stocks")
+
+
+async def test_batcher_flushes_ticks_in_one_pipeline():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    _clear(db_sync)
+    forget_price_series()
+
+    batcher = TickBatcher(db, max_ticks=3)
+    await batcher.add_trade("TESTA", 1000, 10.5, 100)
+    await batcher.add_bar("TESTA", 1000, 10.0, 11.0, 9.5, 10.5, 1000)
+
+    assert batcher.pending_ticks == 2
+    assert db_sync.exists("stocks:TESTA:trades:price") == 0
+
+    await batcher.add_trade("TESTB", 1000, 20.5, 100)
+
+    assert batcher.pending_ticks == 0
+    assert batcher.stats()["last_flush_size"] == 3
+    assert db_sync.ts().get("stocks:TESTA:trades:price") == (1000, 10.5)
+    assert db_sync.ts().get("stocks:TESTA:bars:close") == (1000, 10.5)
+    assert db_sync.ts().get("stocks:TESTB:trades:price") == (1000, 20.5)
+    assert set(db_sync.zrange("trending-stocks", 0, -1)) >= {"TESTA", "TESTB"}
+
+    _clear(db_sync)
+    db_sync.close()
+    await db.aclose()
+
+
+async def test_batcher_recreates_series_deleted_behind_its_back():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    _clear(db_sync)
+    forget_price_series()
+
+    batcher = TickBatcher(db)
+    await batcher.add_trade("TESTA", 1000, 10.5, 100)
+    await batcher.flush()
+    _clear(db_sync)
+
+    await batcher.add_trade("TESTA", 2000, 11.5, 100)
+    await batcher.flush()
+
+    assert db_sync.ts().get("stocks:TESTA:trades:price") == (2000, 11.5)
+    assert db_sync.zrange("trending-stocks", 0, -1) == ["TESTA"]
+
+    _clear(db_sync)
+    db_sync.close()
+    await db.aclose()
+
+
+async def test_batcher_keeps_ticks_when_a_flush_fails(monkeypatch):
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    _clear(db_sync)
+    forget_price_series()
+
+    batcher = TickBatcher(db)
+    await batcher.add_trade("TESTA", 1000, 10.5, 100)
+    pipeline_class = type(db.pipeline())
+
+    async def failing_execute(self, raise_on_error=True):
+        raise ConnectionError("Redis went away")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(pipeline_class, "execute", failing_execute)
+        with pytest.raises(ConnectionError):
+            await batcher.flush()
+
+    assert batcher.pending_ticks == 1
+    await batcher.add_trade("TESTA", 2000, 11.5, 100)
+    assert await batcher.flush() == 2
+    assert db_sync.ts().range("stocks:TESTA:trades:price", "-", "+") == [(1000, 10.5), (2000, 11.5)]
+    assert db_sync.zrange("trending-stocks", 0, -1) == ["TESTA"]
+
+    _clear(db_sync)
+    db_sync.close()
+    await db.aclose()
+
+
+async def test_ensure_price_series_creates_compaction_tiers():
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    _clear(db_sync)
+    forget_price_series()
+
+    ensure_price_series(db_sync, "TESTA")
+    rules = db_sync.ts().info("stocks:TESTA:bars:volume").rules
+
+    assert db_sync.exists("stocks:TESTA:bars:close:5m", "stocks:TESTA:bars:close:1h", "stocks:TESTA:bars:close:1d") == 3
+    assert [rule[0] for rule in rules] == [
+        "stocks:TESTA:bars:volume:5m",
+        "stocks:TESTA:bars:volume:1h",
+        "stocks:TESTA:bars:volume:1d",
+    ]
+    assert {str(rule[2]).lower() for rule in rules} == {"sum"}
+    assert db_sync.ts().info("stocks:TESTA:bars:close:1h").labels == {
+        "symbol": "TESTA",
+        "family": "bars",
+        "field": "close",
+        "tier": "1h",
+    }
+
+    _clear(db_sync)
+    db_sync.close()
+
+
+async def test_batcher_drops_samples_for_symbols_it_does_not_own():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    _clear(db_sync)
+    forget_price_series()
+
+    batcher = TickBatcher(db, owns=lambda symbol: symbol == "TESTA")
+    await batcher.add_trade("TESTA", 1000, 10.5, 100)
+    await batcher.add_trade("TESTB", 1000, 20.5, 100)
+    await batcher.add_bar("TESTB", 1000, 20.0, 21.0, 19.5, 20.5, 1000)
+    await batcher.flush()
+
+    assert db_sync.ts().get("stocks:TESTA:trades:price") == (1000, 10.5)
+    assert db_sync.exists("stocks:TESTB:trades:price") == 0
+    assert db_sync.zrange("trending-stocks", 0, -1) == ["TESTA"]
+    assert batcher.stats()["unowned_samples"] == 7
+
+    _clear(db_sync)
+    db_sync.close()
+    await db.aclose()
+
+
+async def test_record_history_writes_backfill_in_one_madd():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    _clear(db_sync)
+    forget_price_series()
+
+    samples = await record_history_async(
+        db,
+        "TESTH",
+        [(1000, 10.5, 100), (2000, 10.75, 50)],
+        [(60_000, 10.0, 11.0, 9.5, 10.5, 1000)],
+    )
+
+    assert samples == 9
+    assert tuple(db_sync.ts().get("stocks:TESTH:trades:price")) == (2000, 10.75)
+    assert tuple(db_sync.ts().get("stocks:TESTH:bars:close")) == (60_000, 10.5)
+    assert db_sync.zscore("trending-stocks", "TESTH") is None
+
+    _clear(db_sync)
+    forget_price_series()
+    db_sync.close()
+    await db.aclose()
+
+
+def test_only_missing_series_errors_are_recovered():
+    samples = [
+        ("stocks:TESTA:trades:price", "1000", 10.5),
+        ("stocks:TESTA:trades:size", "1000", 100),
+        ("stocks:TESTB:trades:price", "1000", 20.5),
+    ]
+    results = [
+        ResponseError("ERR TSDB: the key does not exist"),
+        1000,
+        ResponseError("ERR TSDB: Timestamp is older than retention"),
+    ]
+
+    assert _missing_samples(samples, results) == samples[:1]
+    assert _missing_samples(samples, ResponseError("ERR TSDB: Timestamp is older than retention")) == []
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from store import TickBatcher, forget_price_series
+from tape import BAR, NEWS, RECORD_HEADER, TAPE_MAGIC, TRADE, TRADE_RECORD, TapeReader, TapeRecorder
+
+
+def _record(path: Path) -> None:
+    recorder = TapeRecorder(path)
+    recorder.record_trade("TAPE", 1_000, 101.5, 10)
+    recorder.record_bar("TAPE", 1_000, 100.0, 102.0, 99.5, 101.5, 500)
+    recorder.record_news("TAPE", {"id": "tape-1", "headline": "Tape headline", "symbols": ["TAPE"]})
+    recorder.close()
+
+
+class _Trades:
+    def __init__(self) -> None:
+        self.timestamps: list[int] = []
+
+    async def add_trade(self, symbol: str, timestamp_ms: int, price: float, size: int) -> None:
+        self.timestamps.append(timestamp_ms)
+
+    async def flush(self) -> int:
+        return 0
+
+
+def test_tape_round_trips_records_and_ignores_truncated_tail(tmp_path):
+    path = tmp_path / "feed.tape"
+    _record(path)
+    with path.open("ab") as tape:
+        tape.write(b"\x01\xff\x00")
+
+    records = list(TapeReader(path))
+
+    assert [(kind, symbol) for kind, _, symbol, _ in records] == [(TRADE, "TAPE"), (BAR, "TAPE"), (NEWS, "TAPE")]
+    assert records[0][3] == (1_000, 101.5, 10)
+    assert records[1][3] == (1_000, 100.0, 102.0, 99.5, 101.5, 500)
+    assert records[2][3][0]["headline"] == "Tape headline"
+    assert records[0][1] <= records[1][1] <= records[2][1]
+
+
+async def test_tape_replays_through_batcher(tmp_path):
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    forget_price_series()
+    await db.json().set("stocks:TAPE", "$", {"pk": "TAPE", "symbol": "TAPE", "name": "Tape Inc.", "news": []})
+    path = tmp_path / "feed.tape"
+    _record(path)
+
+    stats = await TapeReader(path).replay(db, TickBatcher(db), speed=0)
+
+    assert stats["records"] == 3
+    assert (await db.ts().get("stocks:TAPE:trades:price"))[1] == 101.5
+    assert (await db.ts().get("stocks:TAPE:bars:close"))[1] == 101.5
+    assert (await db.json().get("stocks:TAPE", "$.news[0].id")) == ["tape-1"]
+
+    keys = await db.keys("stocks:TAPE*")
+    if keys:
+        await db.delete(*keys)
+    await db.delete("trending-stocks")
+    forget_price_series()
+    await db.aclose()
+
+
+async def test_tape_replay_scales_timestamps_and_never_rewinds_across_loops(tmp_path):
+    path = tmp_path / "feed.tape"
+    with path.open("wb") as tape:
+        tape.write(TAPE_MAGIC)
+        for received_ms in (1_000, 1_200):
+            payload = TRADE_RECORD.pack(received_ms, 101.5, 10) + b"TAPE"
+            tape.write(RECORD_HEADER.pack(TRADE, len(payload), received_ms * 1_000_000) + payload)
+    reader = TapeReader(path)
+    trades = _Trades()
+
+    await reader.replay(None, trades, speed=2)
+    await reader.replay(None, trades, speed=2)
+
+    first, second, third, fourth = trades.timestamps
+    assert second - first == 100
+    assert fourth - third == 100
+    assert third > second
+    assert fourth <= time.time_ns() // 1_000_000 + 1
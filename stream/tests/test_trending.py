@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from trending import (
+    TRENDING_BUCKET_MS,
+    TRENDING_DECAY_RATE,
+    TRENDING_KEY,
+    TRENDING_WINDOW_BUCKETS,
+    queue_trending,
+    reset_trending,
+    reset_trending_async,
+    roll_trending,
+    trade_weight,
+)
+
+
+async def _queue(db: AsyncRedis, weights: dict[str, float], now_ms: int) -> None:
+    pipe = db.pipeline(transaction=False)
+    queue_trending(pipe, weights, now_ms)
+    await pipe.execute()
+
+
+def test_trade_weight_modes():
+    assert trade_weight(10.0, 30, "count") == 1.0
+    assert trade_weight(10.0, 30, "volume") == 30.0
+    assert trade_weight(10.0, 30, "notional") == 300.0
+
+
+async def test_bucket_expiry_is_queued_once_per_bucket():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    await reset_trending_async(db)
+    start = 2_000 * TRENDING_BUCKET_MS
+
+    pipe = db.pipeline(transaction=False)
+    queue_trending(pipe, {"AAPL": 1.0}, start)
+    queue_trending(pipe, {"AAPL": 1.0}, start + 1)
+    queue_trending(pipe, {"AAPL": 1.0}, start + TRENDING_BUCKET_MS)
+
+    first_bucket = ["ZINCRBY", "ZINCRBY", "PEXPIRE", "ZINCRBY", "ZINCRBY"]
+    next_bucket = ["ZINCRBY", "ZINCRBY", "PEXPIRE"]
+    assert [args[0] for args, _ in pipe.command_stack] == first_bucket + next_bucket
+
+    await pipe.reset()
+    await reset_trending_async(db)
+    await db.aclose()
+
+
+def test_sync_reset_clears_buckets_and_requeues_expiry():
+    db_sync = Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    start = 3_000 * TRENDING_BUCKET_MS
+    pipe = db_sync.pipeline(transaction=False)
+    queue_trending(pipe, {"AAPL": 1.0}, start)
+    pipe.execute()
+    db_sync.set(f"{TRENDING_KEY}:rolled", 3_000)
+
+    reset_trending(db_sync)
+
+    assert db_sync.keys(f"{TRENDING_KEY}*") == []
+    pipe = db_sync.pipeline(transaction=False)
+    queue_trending(pipe, {"AAPL": 1.0}, start)
+    assert [args[0] for args, _ in pipe.command_stack] == ["ZINCRBY", "ZINCRBY", "PEXPIRE"]
+    pipe.reset()
+    db_sync.close()
+
+
+async def test_trending_decays_and_drops_expired_buckets():
+    db = AsyncRedis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379"),
+        decode_responses=True,
+    )
+    await reset_trending_async(db)
+    start = 1_000 * TRENDING_BUCKET_MS
+    decay = math.exp(-TRENDING_DECAY_RATE * TRENDING_BUCKET_MS)
+
+    assert await roll_trending(db, start) == 0
+    await _queue(db, {"AAPL": 3.0, "MSFT": 1.0}, start)
+    assert await roll_trending(db, start + TRENDING_BUCKET_MS) == 1
+    await _queue(db, {"MSFT": 4.0}, start + TRENDING_BUCKET_MS)
+
+    scores = dict(await db.zrevrange(TRENDING_KEY, 0, -1, withscores=True))
+    assert scores["AAPL"] == pytest.approx(3 * decay)
+    assert scores["MSFT"] == pytest.approx(decay + 4)
+
+    await roll_trending(db, start + TRENDING_WINDOW_BUCKETS * TRENDING_BUCKET_MS)
+
+    scores = dict(await db.zrevrange(TRENDING_KEY, 0, -1, withscores=True))
+    assert list(scores) == ["MSFT"]
+    assert scores["MSFT"] == pytest.approx(4 * decay ** (TRENDING_WINDOW_BUCKETS - 1))
+
+    await roll_trending(db, start + 3 * TRENDING_WINDOW_BUCKETS * TRENDING_BUCKET_MS)
+
+    assert await db.exists(TRENDING_KEY) == 0
+
+    await reset_trending_async(db)
+    await db.aclose()
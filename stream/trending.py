@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections.abc import Mapping
+from typing import TYPE_CHECKING
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.client import Pipeline
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError, ResponseError
+
+if TYPE_CHECKING:
+    from notifier import Notifier
+
+LOGGER = logging.getLogger(__name__)
+
+TRENDING_KEY = "trending-stocks"
+TRENDING_ROLLED_KEY = f"{TRENDING_KEY}:rolled"
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", "12"))
+TRENDING_WINDOW_MS = int(os.getenv("TRENDING_WINDOW_MS", str(5 * 60 * 1000)))
+TRENDING_BUCKET_MS = max(int(os.getenv("TRENDING_BUCKET_MS", "10000")), 1)
+TRENDING_HALF_LIFE_MS = int(os.getenv("TRENDING_HALF_LIFE_MS", "60000"))
+TRENDING_WEIGHT = os.getenv("TRENDING_WEIGHT", "count").lower()
+TRENDING_MIN_SCORE = 1e-6
+TRENDING_WINDOW_BUCKETS = max(math.ceil(TRENDING_WINDOW_MS / TRENDING_BUCKET_MS), 1)
+TRENDING_DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE_MS if TRENDING_HALF_LIFE_MS > 0 else 0.0
+
+ROLL_SCRIPT = """
+local previous = redis.call('SET', KEYS[2], ARGV[1], 'GET')
+if not previous then
+    return 0
+end
+local current = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local steps = current - tonumber(previous)
+if steps <= 0 then
+    return 0
+end
+if steps > window then
+    redis.call('DEL', KEYS[1])
+    return steps
+end
+for index = tonumber(previous) + 1, current do
+    local expired = KEYS[1] .. ':' .. (index - window)
+    redis.call('ZUNIONSTORE', KEYS[1], 2, KEYS[1], expired, 'WEIGHTS', ARGV[3], ARGV[4])
+    redis.call('DEL', expired)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[5])
+return steps
+"""
+ROLL = AsyncScript(None, ROLL_SCRIPT.encode())
+
+_expiring_bucket: int | None = None
+
+
+def make_bucket_key(index: int) -> str:
+    return f"{TRENDING_KEY}:{index}"
+
+
+def bucket_index(now_ms: int) -> int:
+    return now_ms // TRENDING_BUCKET_MS
+
+
+def trade_weight(price: float, size: int, weight: str = TRENDING_WEIGHT) -> float:
+    if weight == "volume":
+        return float(size)
+    if weight == "notional":
+        return price * size
+    return 1.0
+
+
+def queue_trending(pipe: Pipeline, weights: Mapping[str, float], now_ms: int | None = None) -> None:
+    global _expiring_bucket
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    index = bucket_index(now_ms)
+    boost = math.exp(TRENDING_DECAY_RATE * (now_ms - index * TRENDING_BUCKET_MS))
+    bucket_key = make_bucket_key(index)
+    for symbol, weight in weights.items():
+        pipe.zincrby(TRENDING_KEY, weight * boost, symbol)
+        pipe.zincrby(bucket_key, weight * boost, symbol)
+    if index != _expiring_bucket:
+        pipe.pexpire(bucket_key, (TRENDING_WINDOW_BUCKETS + 2) * TRENDING_BUCKET_MS)
+        _expiring_bucket = index
+
+
+def trending_failed(results: list[object]) -> bool:
+    return any(isinstance(result, RedisError) for result in results)
+
+
+async def roll_trending(db: AsyncRedis, now_ms: int | None = None) -> int:
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    step_decay = math.exp(-TRENDING_DECAY_RATE * TRENDING_BUCKET_MS)
+    expired_decay = math.exp(-TRENDING_DECAY_RATE * TRENDING_WINDOW_BUCKETS * TRENDING_BUCKET_MS)
+    args = [bucket_index(now_ms), TRENDING_WINDOW_BUCKETS, step_decay, -expired_decay, TRENDING_MIN_SCORE]
+    try:
+        return await ROLL(keys=[TRENDING_KEY, TRENDING_ROLLED_KEY], args=args, client=db)
+    except ResponseError:
+        await reset_trending_async(db)
+        return 0
+
+
+def reset_trending(db_sync: Redis) -> None:
+    global _expiring_bucket
+    db_sync.delete(TRENDING_KEY, *db_sync.scan_iter(match=f"{TRENDING_KEY}:*"))
+    _expiring_bucket = None
+
+
+async def reset_trending_async(db: AsyncRedis) -> None:
+    global _expiring_bucket
+    keys = [key async for key in db.scan_iter(match=f"{TRENDING_KEY}:*")]
+    await db.delete(TRENDING_KEY, *keys)
+    _expiring_bucket = None
+
+
+async def ensure_trending_async(db: AsyncRedis) -> None:
+    if await db.type(TRENDING_KEY) not in ("zset", "none"):
+        await reset_trending_async(db)
+
+
+async def trending_loop(db: AsyncRedis, notifier: Notifier) -> None:
+    while True:
+        await asyncio.sleep((TRENDING_BUCKET_MS - int(time.time() * 1000) % TRENDING_BUCKET_MS) / 1000)
+        try:
+            if await roll_trending(db):
+                notifier.mark_trending()
+        except RedisError:
+            LOGGER.exception("Trending rollover failed")
@@ -0,0 +1,24 @@
+import { appendBar } from "@/features/chart/bar-points";
+
+describe("bar points", () => {
+  const points: Array<[number, number]> = [
+    [1000, 10],
+    [2000, 11],
+  ];
+
+  it("appends the close of a new bar", () => {
+    expect(appendBar(points, { symbol: "AAPL", bar: [3000, 11, 12.5, 10.5, 12, 500] })).toEqual([
+      [1000, 10],
+      [2000, 11],
+      [3000, 12],
+    ]);
+  });
+
+  it("replaces a bar with the same timestamp and ignores older bars", () => {
+    expect(appendBar(points, { symbol: "AAPL", bar: [2000, 11, 12, 10, 11.5, 500] })).toEqual([
+      [1000, 10],
+      [2000, 11.5],
+    ]);
+    expect(appendBar(points, { symbol: "AAPL", bar: [500, 9, 9, 9, 9, 1] })).toBe(points);
+  });
+});
@@ -0,0 +1,29 @@
+import { applyTrendingMessage } from "@/features/trending/trending-snapshot";
+
+describe("trending snapshots", () => {
+  const state = applyTrendingMessage(
+    { version: 0, ranking: [] },
+    { type: "snapshot", version: 3, ranking: ["AAPL", 6, "MSFT", 5, "META", 2] },
+  );
+
+  it("applies diffs on top of their base version", () => {
+    expect(
+      applyTrendingMessage(state, { type: "diff", version: 4, base: 3, set: { TSLA: 9, AAPL: 6.5 }, remove: ["META"] }),
+    ).toEqual({ version: 4, ranking: ["TSLA", 9, "AAPL", 6.5, "MSFT", 5] });
+  });
+
+  it("marks the state stale when a newer diff does not apply", () => {
+    const stale = applyTrendingMessage(state, { type: "diff", version: 6, base: 5, set: { TSLA: 9 }, remove: [] });
+
+    expect(stale).toEqual({ ...state, stale: true });
+    expect(applyTrendingMessage(stale, { type: "diff", version: 7, base: 6, set: {}, remove: [] })).toBe(stale);
+    expect(applyTrendingMessage(stale, { type: "snapshot", version: 7, ranking: ["TSLA", 9] })).toEqual({
+      version: 7,
+      ranking: ["TSLA", 9],
+    });
+  });
+
+  it("ignores diffs older than the current version", () => {
+    expect(applyTrendingMessage(state, { type: "diff", version: 3, base: 2, set: { TSLA: 9 }, remove: [] })).toBe(state);
+  });
+});
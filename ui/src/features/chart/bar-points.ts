@@ -0,0 +1,18 @@
+export type IncomingBar = {
+  symbol: string;
+  bar: [number, number, number, number, number, number];
+};
+
+export const MAX_BAR_POINTS = 30;
+
+export function appendBar<T extends [number, number]>(points: T[], message: IncomingBar): T[] {
+  const [timestamp, , , , close] = message.bar;
+  const last = points[points.length - 1];
+  if (last && timestamp < last[0]) {
+    return points;
+  }
+
+  const point = [timestamp, close] as T;
+  const next = last && last[0] === timestamp ? [...points.slice(0, -1), point] : [...points, point];
+  return next.slice(-Math.max(points.length, MAX_BAR_POINTS));
+}
@@ -2,6 +2,12 @@
 
 import { useCallback, useDeferredValue, useEffect, useMemo, useState } from "react";
 
+import { appendBar, type IncomingBar } from "@/features/chart/bar-points";
+import {
+  applyTrendingMessage,
+  type TrendingMessage,
+  type TrendingState,
+} from "@/features/trending/trending-snapshot";
 import {
   getBars,
   getClose,
@@ -51,7 +57,9 @@ export function useDashboard(): DashboardState {
   const [currentStock, setCurrentStock] = useState<Stock | null>(null);
   const [currentBars, setCurrentBars] = useState<PricePoint[]>([]);
   const [stockInfo, setStockInfo] = useState<Record<string, PriceInfo>>({});
-  const [trending, setTrending] = useState<Array<string | number>>([]);
+  const [trendingState, setTrendingState] = useState<TrendingState>({ version: 0, ranking: [] });
+  const [trendingConnection, setTrendingConnection] = useState(0);
+  const trending = trendingState.ranking;
   const [searchResults, setSearchResults] = useState<Stock[]>([]);
   const [searchText, setSearchText] = useState("");
   const [clearPending, setClearPending] = useState(false);
@@ -112,7 +120,7 @@ export function useDashboard(): DashboardState {
       setCurrentStock(null);
       setCurrentBars([]);
       setStockInfo({});
-      setTrending([]);
+      setTrendingState((previous) => ({ version: previous.version, ranking: [] }));
       setSearchResults([]);
       setSearchText("");
       await refreshWatchlist();
@@ -132,7 +140,9 @@ export function useDashboard(): DashboardState {
 
   useEffect(() => {
     void refreshWatchlist();
-    void getTrending().then(setTrending);
+    void getTrending().then((ranking) => {
+      setTrendingState((previous) => (previous.version > 0 ? previous : { version: 0, ranking }));
+    });
   }, [refreshWatchlist]);
 
   useEffect(() => {
@@ -174,9 +184,22 @@ export function useDashboard(): DashboardState {
       return undefined;
     }
 
-    const disconnectTrending = connectWebSocket(`${config.wsUrl}/trending`, (message) => {
-      setTrending(JSON.parse(message));
+    return connectWebSocket(`${config.wsUrl}/trending`, (message) => {
+      setTrendingState((previous) => applyTrendingMessage(previous, JSON.parse(message) as TrendingMessage));
     });
+  }, [trendingConnection]);
+
+  useEffect(() => {
+    if (trendingState.stale) {
+      setTrendingConnection((previous) => previous + 1);
+    }
+  }, [trendingState.stale]);
+
+  useEffect(() => {
+    if (typeof window === "undefined" || typeof WebSocket === "undefined") {
+      return undefined;
+    }
+
     const disconnectTrades = connectWebSocket(`${config.wsUrl}/trade`, (message) => {
       const tradeMessage = JSON.parse(message) as IncomingTrade;
       setStockInfo((previous) => {
@@ -192,20 +215,20 @@ export function useDashboard(): DashboardState {
       });
     });
     const disconnectBars = connectWebSocket(`${config.wsUrl}/bars`, (message) => {
+      const barMessage = JSON.parse(message) as IncomingBar;
       setCurrentStock((existing) => {
-        if (existing && existing.symbol === message) {
-          void refreshBars(existing.symbol);
+        if (existing && existing.symbol === barMessage.symbol) {
+          setCurrentBars((previous) => appendBar(previous, barMessage));
         }
         return existing;
       });
     });
 
     return () => {
-      disconnectTrending();
       disconnectTrades();
       disconnectBars();
     };
-  }, [refreshBars]);
+  }, []);
 
   return useMemo(
     () => ({
@@ -13,7 +13,7 @@ export function TrendingCard({ trending }: { trending: Array<string | number> })
 
   return (
     <Panel
-      subtitle="Top-K ranking of the most active symbols in the watchlist over the last minute."
+      subtitle="Most active symbols over the last five minutes, weighted toward recent trades."
       title="Trending symbols"
     >
       {rows.length === 0 ? (
@@ -0,0 +1,39 @@
+export type TrendingState = {
+  version: number;
+  ranking: Array<string | number>;
+  stale?: boolean;
+};
+
+export type TrendingMessage =
+  | { type: "snapshot"; version: number; ranking: Array<string | number> }
+  | { type: "diff"; version: number; base: number; set: Record<string, number>; remove: string[] };
+
+export function applyTrendingMessage(state: TrendingState, message: TrendingMessage): TrendingState {
+  if (message.type === "snapshot") {
+    return { version: message.version, ranking: message.ranking };
+  }
+
+  if (message.base !== state.version) {
+    return message.version > state.version && !state.stale ? { ...state, stale: true } : state;
+  }
+
+  const scores = new Map<string, number>();
+  for (let index = 0; index < state.ranking.length; index += 2) {
+    scores.set(String(state.ranking[index]), Number(state.ranking[index + 1]));
+  }
+  for (const symbol of message.remove) {
+    scores.delete(symbol);
+  }
+  for (const [symbol, score] of Object.entries(message.set)) {
+    scores.set(symbol, score);
+  }
+
+  const entries = [...scores.entries()].sort(([symbolA, scoreA], [symbolB, scoreB]) => {
+    if (scoreA !== scoreB) {
+      return scoreB - scoreA;
+    }
+    return symbolA < symbolB ? -1 : symbolA > symbolB ? 1 : 0;
+  });
+
+  return { version: message.version, ranking: entries.flat() };
+}